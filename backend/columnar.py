@@ -0,0 +1,74 @@
+"""
+Columnar binary encoding for history responses.
+
+Layout (all values little-endian):
+
+    magic      4 bytes   b"WXC1"
+    rows       uint32    number of rows
+    columns    uint16    number of columns
+    directory  per column: uint8 name length, name (UTF-8), 1 byte type code
+    padding    zero bytes up to the next multiple of 8
+    data       per column, in directory order: rows * 8 bytes
+
+Type codes follow the array module: "q" is int64 and "d" is float64. Missing
+float values are NaN. Timestamps are epoch seconds in an int64 column. Every
+array is 8-byte aligned, so a client can view it with memoryview.cast() without copying.
+"""
+import struct
+import sys
+from array import array
+from datetime import datetime
+from typing import Dict, List
+
+MEDIA_TYPE = "application/vnd.weather.columnar"
+MAGIC = b"WXC1"
+
+# Columns stored as int64; everything else numeric is float64
+INTEGER_COLUMNS = {'id', 'samples'}
+
+# Text columns that have no place in a numeric array
+SKIPPED_COLUMNS = {'station', 'raw_data'}
+
+
+def _epoch_seconds(timestamp) -> int:
+    """Convert a stored timestamp (epoch seconds or ISO string) to epoch seconds."""
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    return int(datetime.fromisoformat(timestamp).timestamp())
+
+
+def _float_or_nan(value) -> float:
+    """Convert a stored value to float, using NaN for missing or malformed values."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def encode(records: List[Dict]) -> bytes:
+    """
+    Encode history rows as one packed array per column.
+
+    :param records: List of history dictionaries, all with the same keys
+    :return: Encoded payload
+    """
+    names = [name for name in (records[0] if records else {}) if name not in SKIPPED_COLUMNS]
+
+    directory = bytearray(MAGIC)
+    directory += struct.pack('<IH', len(records), len(names))
+    arrays = []
+    for name in names:
+        if name == 'timestamp':
+            column = array('q', (_epoch_seconds(record[name]) for record in records))
+        elif name in INTEGER_COLUMNS:
+            column = array('q', (int(record[name] or 0) for record in records))
+        else:
+            column = array('d', (_float_or_nan(record[name]) for record in records))
+        if sys.byteorder == 'big':
+            column.byteswap()
+        encoded_name = name.encode()
+        directory += struct.pack('<B', len(encoded_name)) + encoded_name + column.typecode.encode()
+        arrays.append(column)
+
+    directory += bytes(-len(directory) % 8)
+    return bytes(directory) + b''.join(column.tobytes() for column in arrays)
@@ -2,97 +2,939 @@
 SQLite database operations for weather data storage.
 
 Stores converted metric weather data with automatic cleanup of old records.
+
+Raw reports are partitioned by month into weather_reports_YYYYMM tables, so a
+range query only touches the months it overlaps and retention drops whole
+months instead of deleting rows. Report ids are allocated from one global
+sequence, so they keep increasing across partitions.
+
+A single long-lived writer connection handles all writes, and a small pool of
+read connections serves queries. With WAL journaling, readers never wait on the
+writer. SQL statements are module constants so each connection's statement
+cache reuses the prepared statements; queries built per column projection are
+memoized for the same reason.
 """
+import ast
+import queue
 import sqlite3
-from datetime import datetime, timedelta
-from typing import Dict, List
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import metrics
+import settings
+from report import WeatherReport, parse_fields
+
+# Bumped whenever the schema changes; see WeatherDatabase._upgrade()
+SCHEMA_VERSION = 6
+
+# Rollup resolutions: name -> bucket width in minutes. Each has its own weather_rollup_<name> table.
+ROLLUP_RESOLUTIONS = {'5m': 5, '1h': 60, '1d': 1440}
+
+# Metrics aggregated into rollups: column name -> key in the metric data.
+# Wind direction is left out because a min/max/mean of a bearing is meaningless.
+ROLLUP_METRICS = {
+    'temp_c': 'temp_c',
+    'humidity': 'humidity',
+    'uv': 'uv',
+    'wind_speed_kmh': 'wind_speed_kmh',
+    'rain_rate_mm': 'rain_rate_mm',
+    'solar_radiation': 'solarradiation',
+    'pressure_hpa': 'pressure_hpa',
+}
+
+# Reporting interval assumed when a payload doesn't carry one, used to turn rain rate into rainfall
+DEFAULT_INTERVAL_SECONDS = 60
+
+# Raw reports live in one table per (local) calendar month, named with this prefix plus YYYYMM
+PARTITION_PREFIX = 'weather_reports_'
+
+# Timestamps are integer epoch seconds: `timestamp` is when the backend received the
+# report and `dateutc` is the station's own clock. Rollup buckets are epoch seconds
+# of the bucket start (buckets follow local time, so days start at local midnight).
+
+
+def _partition_create_sql(table: str) -> List[str]:
+    """
+    Build the statements that create one monthly partition and its indexes.
+
+    Ids are assigned from report_sequence rather than per table, so they stay unique across partitions.
+    """
+    return [
+        f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                id INTEGER PRIMARY KEY,
+                station TEXT,
+                timestamp INTEGER NOT NULL,
+                dateutc INTEGER,
+                temp_c REAL,
+                humidity INTEGER,
+                uv REAL,
+                wind_speed_kmh REAL,
+                wind_dir INTEGER,
+                rain_rate_mm REAL,
+                solar_radiation REAL,
+                pressure_hpa REAL,
+                dew_point_c REAL,
+                feels_like_c REAL,
+                temp_min_c REAL,
+                temp_max_c REAL,
+                rain_today_mm REAL,
+                raw_data TEXT
+            )
+        ''',
+        f'CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table}(timestamp)',
+        f'CREATE INDEX IF NOT EXISTS idx_{table}_station_timestamp ON {table}(station, timestamp)',
+    ]
+
+
+@lru_cache(maxsize=None)
+def _insert_report_sql(table: str) -> str:
+    """Build the INSERT statement for one partition."""
+    return f'''
+        INSERT INTO {table}
+        (id, station, timestamp, dateutc, temp_c, humidity, uv, wind_speed_kmh, wind_dir,
+         rain_rate_mm, solar_radiation, pressure_hpa, dew_point_c, feels_like_c, temp_min_c,
+         temp_max_c, rain_today_mm, raw_data)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
+
+# Partitions from a given month onwards; YYYYMM names sort chronologically
+SELECT_PARTITIONS_SQL = f'''
+    SELECT name FROM sqlite_master
+    WHERE type = 'table' AND name GLOB '{PARTITION_PREFIX}[0-9][0-9][0-9][0-9][0-9][0-9]' AND name >= ?
+    ORDER BY name
+'''
+
+SELECT_EXPIRED_PARTITIONS_SQL = f'''
+    SELECT name FROM sqlite_master
+    WHERE type = 'table' AND name GLOB '{PARTITION_PREFIX}[0-9][0-9][0-9][0-9][0-9][0-9]' AND name < ?
+    ORDER BY name
+'''
+
+# Last report id handed out; the single row is updated in the same transaction as the inserts
+CREATE_SEQUENCE_SQL = 'CREATE TABLE IF NOT EXISTS report_sequence (last_id INTEGER NOT NULL)'
+INIT_SEQUENCE_SQL = 'INSERT INTO report_sequence (last_id) SELECT ? WHERE NOT EXISTS (SELECT 1 FROM report_sequence)'
+SELECT_MAX_ID_SQL = 'SELECT last_id FROM report_sequence'
+UPDATE_SEQUENCE_SQL = 'UPDATE report_sequence SET last_id = ?'
+
+# Columns a history query can return for raw reports, in table order
+REPORT_FIELDS = (
+    'id', 'station', 'timestamp', 'dateutc', 'temp_c', 'humidity', 'uv', 'wind_speed_kmh',
+    'wind_dir', 'rain_rate_mm', 'solar_radiation', 'pressure_hpa', 'dew_point_c', 'feels_like_c',
+    'temp_min_c', 'temp_max_c', 'rain_today_mm', 'raw_data',
+)
+
+# Derived columns added in schema version 5; see derived.py
+DERIVED_REPORT_FIELDS = ('dew_point_c', 'feels_like_c', 'temp_min_c', 'temp_max_c', 'rain_today_mm')
+
+# Columns of the schema version 4 table, which the version 4 upgrade copies into partitions
+V4_REPORT_FIELDS = tuple(field for field in REPORT_FIELDS if field not in DERIVED_REPORT_FIELDS)
+
+# Always returned: id bounds the delta cursor and timestamp places the row in time
+REQUIRED_REPORT_FIELDS = ('id', 'timestamp')
+
+# Returned when no fields are requested. raw_data repeats the whole payload as text
+# and is larger than every other column combined, so it is only sent when asked for.
+DEFAULT_REPORT_FIELDS = tuple(field for field in REPORT_FIELDS if field != 'raw_data')
+
+# Fields a rollup query can return; each metric brings its mean, _min, _max and _last.
+# station, timestamp and samples are always returned.
+ROLLUP_FIELDS = ('rain_mm', *ROLLUP_METRICS)
+
+
+@lru_cache(maxsize=256)
+def _history_sql(table: str, fields: Tuple[str, ...], by_station: bool, delta: bool) -> str:
+    """
+    Build the raw history query for one partition and projection.
+
+    Cached so each combination always maps to the same SQL string and hits the
+    connection's statement cache.
+    """
+    columns = ', '.join(fields)
+    if delta:
+        # Delta queries walk the rowid range; the unary + keeps the planner off the timestamp/station indexes
+        station_filter = ' AND +station = ?' if by_station else ''
+        return f'''
+            SELECT {columns} FROM {table}
+            WHERE id > ? AND id <= ? AND +timestamp > ?{station_filter}
+            ORDER BY id ASC
+        '''
+    station_filter = 'station = ? AND ' if by_station else ''
+    return f'''
+        SELECT {columns} FROM {table}
+        WHERE {station_filter}timestamp > ?
+        ORDER BY timestamp ASC
+    '''
+
+
+def _project(fields: Iterable[str], available: Tuple[str, ...],
+             required: Tuple[str, ...] = ()) -> Tuple[str, ...]:
+    """
+    Validate requested fields and return them, plus the required ones, in canonical order.
+
+    :raises ValueError: If a requested field doesn't exist
+    """
+    requested = set(fields)
+    unknown = requested.difference(available)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    requested.update(required)
+    return tuple(field for field in available if field in requested)
+
+
+def report_fields(fields: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    Resolve a raw history projection.
+
+    :param fields: Requested column names, or None for DEFAULT_REPORT_FIELDS
+    :return: Columns to select, in table order
+    :raises ValueError: If a requested field doesn't exist
+    """
+    if fields is None:
+        return DEFAULT_REPORT_FIELDS
+    return _project(fields, REPORT_FIELDS, REQUIRED_REPORT_FIELDS)
+
+
+def rollup_fields(fields: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    Resolve a rollup history projection.
+
+    :param fields: Requested metric names (or rain_mm), or None for all of them
+    :return: Fields to select, in ROLLUP_FIELDS order
+    :raises ValueError: If a requested field doesn't exist
+    """
+    if fields is None:
+        return ROLLUP_FIELDS
+    return _project(fields, ROLLUP_FIELDS)
+
+
+def rollup_columns(fields: Optional[Iterable[str]] = None) -> Tuple[str, ...]:
+    """
+    Name the columns a rollup history query returns.
+
+    :param fields: Requested metric names (or rain_mm), or None for all of them
+    :return: Column names, in the order the query returns them
+    :raises ValueError: If a requested field doesn't exist
+    """
+    fields = rollup_fields(fields)
+    columns = ['station', 'timestamp', 'samples']
+    if 'rain_mm' in fields:
+        columns.append('rain_mm')
+    for m in ROLLUP_METRICS:
+        if m in fields:
+            columns += [m, f'{m}_min', f'{m}_max', f'{m}_last']
+    return tuple(columns)
+
+
+# Rollup tables retention prunes row by row (raw reports are dropped a partition at a time)
+RETENTION_COLUMNS = {f'weather_rollup_{res}': 'bucket' for res in ROLLUP_RESOLUTIONS}
+
+# Deletes are bounded so a large backlog of expired rows never holds the write lock for long
+DELETE_EXPIRED_SQL = {
+    table: f'DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} WHERE {column} < ? LIMIT ?)'
+    for table, column in RETENTION_COLUMNS.items()
+}
+
+
+def _rollup_create_sql(table: str) -> List[str]:
+    """
+    Build the statements that create a rollup table and its index.
+
+    Each metric keeps min, max, sum and count (for the mean) and its last value.
+    Station is stored as '' rather than NULL so the (station, bucket) upsert key always matches.
+    """
+    metric_columns = ''.join(
+        f'{m}_min REAL, {m}_max REAL, {m}_sum REAL NOT NULL DEFAULT 0, '
+        f'{m}_count INTEGER NOT NULL DEFAULT 0, {m}_last REAL, '
+        for m in ROLLUP_METRICS
+    )
+    create_sql = f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            station TEXT NOT NULL DEFAULT '',
+            bucket INTEGER NOT NULL,
+            samples INTEGER NOT NULL,
+            rain_mm REAL NOT NULL,
+            {metric_columns}
+            PRIMARY KEY (station, bucket)
+        )
+    '''
+    return [create_sql, _rollup_index_sql(table)]
+
+
+def _rollup_index_sql(table: str) -> str:
+    """
+    Build the bucket index for a rollup table.
+
+    The primary key only helps queries for one station; queries across all
+    stations and retention's deletes range over bucket alone.
+    """
+    return f'CREATE INDEX IF NOT EXISTS idx_{table}_bucket ON {table}(bucket)'
+
+
+def _rollup_upsert_sql(table: str) -> str:
+    """Build the statement that folds one report into its rollup bucket."""
+    columns = ', '.join(
+        f'{m}_min, {m}_max, {m}_sum, {m}_count, {m}_last' for m in ROLLUP_METRICS
+    )
+    placeholders = ', '.join('?' for _ in range(4 + 5 * len(ROLLUP_METRICS)))
+    updates = ', '.join(
+        f'{m}_min = min(coalesce({m}_min, excluded.{m}_min), coalesce(excluded.{m}_min, {m}_min)), '
+        f'{m}_max = max(coalesce({m}_max, excluded.{m}_max), coalesce(excluded.{m}_max, {m}_max)), '
+        f'{m}_sum = {m}_sum + excluded.{m}_sum, '
+        f'{m}_count = {m}_count + excluded.{m}_count, '
+        f'{m}_last = coalesce(excluded.{m}_last, {m}_last)'
+        for m in ROLLUP_METRICS
+    )
+    return f'''
+        INSERT INTO {table} (station, bucket, samples, rain_mm, {columns})
+        VALUES ({placeholders})
+        ON CONFLICT (station, bucket) DO UPDATE SET
+            samples = samples + 1,
+            rain_mm = rain_mm + excluded.rain_mm,
+            {updates}
+    '''
+
+
+@lru_cache(maxsize=None)
+def _rollup_select_sql(table: str, by_station: bool, fields: Tuple[str, ...] = ROLLUP_FIELDS) -> str:
+    """Build the history query for a rollup table, returning the mean under each metric's own name."""
+    columns = ['station', 'bucket AS timestamp', 'samples']
+    if 'rain_mm' in fields:
+        columns.append('round(rain_mm, 2) AS rain_mm')
+    columns.extend(
+        f'round({m}_sum / nullif({m}_count, 0), 2) AS {m}, {m}_min, {m}_max, {m}_last'
+        for m in ROLLUP_METRICS if m in fields
+    )
+    select = ', '.join(columns)
+    station_filter = 'station = ? AND ' if by_station else ''
+    return f'''
+        SELECT {select}
+        FROM {table}
+        WHERE {station_filter}bucket >= ?
+        ORDER BY bucket ASC
+    '''
+
+
+ROLLUP_CREATE_SQL = {res: _rollup_create_sql(f'weather_rollup_{res}') for res in ROLLUP_RESOLUTIONS}
+ROLLUP_UPSERT_SQL = {res: _rollup_upsert_sql(f'weather_rollup_{res}') for res in ROLLUP_RESOLUTIONS}
+
+
+def _bucket_start(timestamp: datetime, minutes: int) -> datetime:
+    """
+    Floor a timestamp to the start of its rollup bucket.
+
+    :param timestamp: Report timestamp
+    :param minutes: Bucket width in minutes (must divide a day evenly)
+    :return: Start of the bucket containing the timestamp
+    """
+    minute_of_day = timestamp.hour * 60 + timestamp.minute
+    start = minute_of_day - minute_of_day % minutes
+    return timestamp.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+
+
+def _epoch(timestamp: datetime) -> int:
+    """Convert a (local, naive) datetime to integer epoch seconds."""
+    return int(timestamp.timestamp())
+
+
+def _partition_name(timestamp: int) -> str:
+    """Name of the partition holding reports received at the given epoch seconds."""
+    return datetime.fromtimestamp(timestamp).strftime(f'{PARTITION_PREFIX}%Y%m')
+
+
+def _parse_dateutc(value) -> Optional[int]:
+    """
+    Parse the station's dateutc field ("YYYY-MM-DD HH:MM:SS", UTC) to epoch seconds.
+
+    :return: Epoch seconds, or None if missing or malformed (some firmware sends "now")
+    """
+    try:
+        return _epoch(datetime.strptime(value, '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc))
+    except (TypeError, ValueError):
+        return None
+
+
+class DatabaseBusy(RuntimeError):
+    """Raised when no read connection frees up within DB_READ_TIMEOUT."""
 
 
 class WeatherDatabase:
     """Manages SQLite storage for weather station reports."""
 
-    def __init__(self, db_path: str = "weather_history.db"):
+    def __init__(self, db_path: str = settings.DB_PATH,
+                 read_pool_size: int = settings.DB_READ_POOL_SIZE,
+                 stream_pool_size: int = settings.DB_STREAM_POOL_SIZE):
         """
-        Initialize database connection.
+        Initialize database connections.
 
         :param db_path: Path to SQLite database file
+        :param read_pool_size: Number of pooled read connections
+        :param stream_pool_size: Number of read connections reserved for streamed history
         """
         self.db_path = db_path
+        self._write_lock = threading.Lock()
+        self._writer = self._connect()
+        # Partitions known to exist, so inserts only issue CREATE TABLE for a new month
+        self._partitions = set()
+        # Bumped after every commit that changes stored reports or rollups (see _changed())
+        self.version = 0
+        self.modified = time.time()
         self.init_db()
 
+        self._readers = queue.Queue()
+        # Streamed responses hold their connection until the client has read everything,
+        # so they get their own pool and a slow download never holds up other queries
+        self._stream_readers = queue.Queue()
+        for readers, size in ((self._readers, read_pool_size), (self._stream_readers, stream_pool_size)):
+            for _ in range(size):
+                reader = self._connect()
+                reader.row_factory = sqlite3.Row
+                reader.execute('PRAGMA query_only = ON')
+                readers.put(reader)
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Open a connection with the configured pragmas applied.
+
+        Connections are shared between threads, so access is serialised by the
+        write lock (writer) or the read pool (readers).
+
+        :return: Configured SQLite connection
+        """
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=settings.DB_BUSY_TIMEOUT,
+            check_same_thread=False,
+            cached_statements=settings.DB_STATEMENT_CACHE_SIZE
+        )
+        # Only takes effect when the file is created (or on VACUUM, see migrate.py), so it must
+        # come before journal_mode, which writes the header of a new database
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute(f'PRAGMA journal_mode = {settings.DB_JOURNAL_MODE}')
+        conn.execute(f'PRAGMA synchronous = {settings.DB_SYNCHRONOUS}')
+        conn.execute(f'PRAGMA mmap_size = {settings.DB_MMAP_SIZE}')
+        conn.execute(f'PRAGMA cache_size = {settings.DB_CACHE_SIZE}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+
+    @contextmanager
+    def _write_connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow the writer connection inside a transaction.
+
+        Commits on success and rolls back on error.
+        """
+        with self._write_lock, self._writer:
+            yield self._writer
+
+    def _changed(self):
+        """
+        Record that committed data changed. Called with the write lock held, after commit.
+
+        version and modified back the ETag and Last-Modified headers of /data/history.
+        """
+        self.version += 1
+        self.modified = time.time()
+
+    @contextmanager
+    def _read_connection(self, stream: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read connection, waiting up to DB_READ_TIMEOUT if all are in use.
+
+        :param stream: Borrow from the pool reserved for streamed responses
+        :raises DatabaseBusy: If no connection frees up in time
+        """
+        readers = self._stream_readers if stream else self._readers
+        try:
+            conn = readers.get(timeout=settings.DB_READ_TIMEOUT)
+        except queue.Empty:
+            raise DatabaseBusy('No read connection available') from None
+        try:
+            yield conn
+        finally:
+            readers.put(conn)
+
+    @contextmanager
+    def _read_snapshot(self, stream: bool = False) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read connection inside a read transaction.
+
+        Every query in the block sees the same committed state, so the partition
+        list, the report sequence and the rows always agree.
+
+        :param stream: Borrow from the pool reserved for streamed responses
+        """
+        with self._read_connection(stream) as conn:
+            conn.execute('BEGIN')
+            try:
+                yield conn
+            finally:
+                conn.rollback()
+
+    def close(self):
+        """Close the writer and all pooled read connections."""
+        with self._write_lock:
+            self._writer.close()
+        for readers in (self._readers, self._stream_readers):
+            while not readers.empty():
+                readers.get_nowait().close()
+
     def init_db(self):
-        """Create weather_reports table if it doesn't exist."""
-        with sqlite3.connect(self.db_path) as conn:
+        """Create the tables if they don't exist, upgrading older schemas in place."""
+        with self._write_connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            existing = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weather_reports'"
+            ).fetchone()
+            # Before version 4 the reports lived in weather_reports; a fresh database has neither
+            if version < SCHEMA_VERSION and (existing or version >= 4):
+                self._upgrade(conn, version)
+
+            conn.execute(CREATE_SEQUENCE_SQL)
+            conn.execute(INIT_SEQUENCE_SQL, (0,))
+            for statements in ROLLUP_CREATE_SQL.values():
+                for create_sql in statements:
+                    conn.execute(create_sql)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            self._partitions = {row[0] for row in conn.execute(SELECT_PARTITIONS_SQL, ('',))}
+
+    def _upgrade(self, conn: sqlite3.Connection, version: int):
+        """
+        Migrate an existing database from an older schema version.
+
+        Steps run in order, so a database several versions behind is brought
+        forward one version at a time. migrate.py runs the same upgrade offline.
+
+        :param conn: Writer connection inside an open transaction
+        :param version: Schema version the database is currently at
+        """
+        if version < 1:
+            # Station column, backfilled from the PASSKEY stored in raw_data
+            conn.execute('ALTER TABLE weather_reports ADD COLUMN station TEXT')
+            rows = conn.execute('SELECT id, raw_data FROM weather_reports').fetchall()
+            updates = []
+            for row_id, raw_data in rows:
+                try:
+                    station = ast.literal_eval(raw_data).get('PASSKEY')
+                except (ValueError, SyntaxError, AttributeError):
+                    continue
+                updates.append((station, row_id))
+            conn.executemany('UPDATE weather_reports SET station = ? WHERE id = ?', updates)
+
+        if version < 2:
+            # Rollup tables, backfilled from the raw reports
+            for statements in ROLLUP_CREATE_SQL.values():
+                for create_sql in statements:
+                    conn.execute(create_sql)
+            self._rebuild_rollups(conn)
+
+        if version < 3:
+            # ISO text timestamps -> integer epoch seconds. strftime('%s', ..., 'utc') reads the
+            # text as local time, matching how it was written. Only text values are converted,
+            # since rollups rebuilt above already hold epoch buckets.
             conn.execute('''
-                CREATE TABLE IF NOT EXISTS weather_reports (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp DATETIME NOT NULL,
-                    temp_c REAL,
-                    humidity INTEGER,
-                    uv REAL,
-                    wind_speed_kmh REAL,
-                    wind_dir INTEGER,
-                    rain_rate_mm REAL,
-                    solar_radiation REAL,
-                    pressure_hpa REAL,
-                    raw_data TEXT
-                )
+                UPDATE weather_reports SET timestamp = CAST(strftime('%s', timestamp, 'utc') AS INTEGER)
+                WHERE typeof(timestamp) = 'text'
             ''')
-            conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON weather_reports(timestamp)')
-            conn.commit()
+            for res in ROLLUP_RESOLUTIONS:
+                conn.execute(f'''
+                    UPDATE weather_rollup_{res} SET bucket = CAST(strftime('%s', bucket, 'utc') AS INTEGER)
+                    WHERE typeof(bucket) = 'text'
+                ''')
+            # Station clock, recovered from the dateutc value in raw_data (already UTC)
+            conn.execute('ALTER TABLE weather_reports ADD COLUMN dateutc INTEGER')
+            marker = "'dateutc': '"
+            conn.execute('''
+                UPDATE weather_reports
+                SET dateutc = CAST(strftime('%s', substr(raw_data, instr(raw_data, ?) + ?, 19)) AS INTEGER)
+                WHERE instr(raw_data, ?) > 0
+            ''', (marker, len(marker), marker))
 
-    def insert_report(self, metric_data: Dict):
+        if version < 4:
+            # Split weather_reports into monthly partitions. Ids are kept (and the sequence
+            # continues from the highest ever handed out) so client cursors stay valid.
+            last_id = max(
+                conn.execute('SELECT coalesce(max(id), 0) FROM weather_reports').fetchone()[0],
+                conn.execute(
+                    "SELECT coalesce(max(seq), 0) FROM sqlite_sequence WHERE name = 'weather_reports'"
+                ).fetchone()[0]
+            )
+            conn.execute(CREATE_SEQUENCE_SQL)
+            conn.execute(INIT_SEQUENCE_SQL, (last_id,))
+            first, last = conn.execute('SELECT min(timestamp), max(timestamp) FROM weather_reports').fetchone()
+            month = datetime.fromtimestamp(first).replace(day=1, hour=0, minute=0, second=0, microsecond=0) \
+                if first is not None else None
+            while month is not None and _epoch(month) <= last:
+                next_month = (month + timedelta(days=32)).replace(day=1)
+                table = _partition_name(_epoch(month))
+                for create_sql in _partition_create_sql(table):
+                    conn.execute(create_sql)
+                conn.execute(f'''
+                    INSERT INTO {table} ({', '.join(V4_REPORT_FIELDS)})
+                    SELECT {', '.join(V4_REPORT_FIELDS)} FROM weather_reports
+                    WHERE timestamp >= ? AND timestamp < ?
+                ''', (_epoch(month), _epoch(next_month)))
+                month = next_month
+            conn.execute('DROP TABLE weather_reports')
+
+        if version < 5:
+            # Derived metrics columns. Older rows keep NULLs: daily extremes depend on
+            # the reports before them, so they are only filled in as reports arrive.
+            for (table,) in conn.execute(SELECT_PARTITIONS_SQL, ('',)).fetchall():
+                columns = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+                for column in DERIVED_REPORT_FIELDS:
+                    if column not in columns:
+                        conn.execute(f'ALTER TABLE {table} ADD COLUMN {column} REAL')
+
+        if version < 6:
+            # Bucket index on the rollups, for queries across all stations and retention
+            for res in ROLLUP_RESOLUTIONS:
+                conn.execute(_rollup_index_sql(f'weather_rollup_{res}'))
+
+    def _rebuild_rollups(self, conn: sqlite3.Connection, chunk_size: int = 5000):
         """
-        Store a weather report with metric units.
+        Populate the rollup tables from every stored raw report.
+
+        Used when upgrading a database that predates rollups.
 
-        :param metric_data: Dictionary containing metric weather data
+        :param conn: Writer connection inside an open transaction
+        :param chunk_size: Number of raw reports folded in per step
         """
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''
-                INSERT INTO weather_reports
-                (timestamp, temp_c, humidity, uv, wind_speed_kmh, wind_dir,
-                 rain_rate_mm, solar_radiation, pressure_hpa, raw_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                datetime.now().isoformat(),
-                metric_data.get('temp_c'),
-                metric_data.get('humidity'),
-                metric_data.get('uv'),
-                metric_data.get('wind_speed_kmh'),
-                metric_data.get('wind_dir'),
-                metric_data.get('rain_rate_mm'),
-                metric_data.get('solarradiation'),
-                metric_data.get('pressure_hpa'),
-                str(metric_data)
+        for res in ROLLUP_RESOLUTIONS:
+            conn.execute(f'DELETE FROM weather_rollup_{res}')
+
+        cursor = conn.execute('SELECT timestamp, raw_data FROM weather_reports ORDER BY id')
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            reports = []
+            for timestamp, raw_data in rows:
+                try:
+                    if isinstance(timestamp, str):
+                        timestamp = datetime.fromisoformat(timestamp)
+                    else:
+                        timestamp = datetime.fromtimestamp(timestamp)
+                    # raw_data holds the form fields as sent, so parsing it recovers the typed report
+                    reports.append((timestamp, parse_fields(ast.literal_eval(raw_data).items())))
+                except (ValueError, SyntaxError, TypeError, AttributeError):
+                    continue
+            self._update_rollups(conn, reports)
+
+    def _update_rollups(self, conn: sqlite3.Connection, reports: List[Tuple[datetime, WeatherReport]]):
+        """
+        Fold reports into every rollup resolution.
+
+        :param conn: Writer connection inside an open transaction
+        :param reports: List of (received timestamp, report) tuples, oldest first
+        """
+        rows = []
+        for timestamp, report in reports:
+            values = [getattr(report, attribute) for attribute in ROLLUP_METRICS.values()]
+            rain_rate = report.rain_rate_mm or 0.0
+            interval = report.interval or DEFAULT_INTERVAL_SECONDS
+            metric_params = []
+            for value in values:
+                has_value = value is not None
+                metric_params += [value, value, value if has_value else 0.0, int(has_value), value]
+            rows.append((
+                timestamp,
+                report.station or '',
+                rain_rate * interval / 3600,
+                metric_params
             ))
-            conn.commit()
 
-    def get_yesterday_data(self, hours_ago: int = 24) -> List[Dict]:
+        for res, minutes in ROLLUP_RESOLUTIONS.items():
+            conn.executemany(ROLLUP_UPSERT_SQL[res], [
+                (station, _epoch(_bucket_start(timestamp, minutes)), 1, rain_mm, *metric_params)
+                for timestamp, station, rain_mm, metric_params in rows
+            ])
+
+    def insert_report(self, report: WeatherReport):
+        """
+        Store a weather report with metric units.
+
+        :param report: Parsed report
+        """
+        self.insert_reports([(datetime.now(), report)])
+
+    def insert_reports(self, reports: List[Tuple[datetime, WeatherReport]]):
+        """
+        Store a batch of weather reports in a single transaction.
+
+        Each report goes to the partition for the month it was received in,
+        creating the partition when a new month starts.
+
+        :param reports: List of (received timestamp, report) tuples
+        """
+        created = []
+        with self._write_lock:
+            started = time.perf_counter()
+            with self._writer as conn:
+                last_id = conn.execute(SELECT_MAX_ID_SQL).fetchone()[0]
+                rows_by_partition: Dict[str, List[Tuple]] = {}
+                for report_id, (timestamp, report) in enumerate(reports, start=last_id + 1):
+                    received = _epoch(timestamp)
+                    rows_by_partition.setdefault(_partition_name(received), []).append((
+                        report_id,
+                        report.station,
+                        received,
+                        _parse_dateutc(report.dateutc),
+                        report.temp_c,
+                        report.humidity,
+                        report.uv,
+                        report.wind_speed_kmh,
+                        report.wind_dir,
+                        report.rain_rate_mm,
+                        report.solarradiation,
+                        report.pressure_hpa,
+                        report.dew_point_c,
+                        report.feels_like_c,
+                        report.temp_min_c,
+                        report.temp_max_c,
+                        report.rain_today_mm,
+                        str(report.as_dict())
+                    ))
+
+                for table, rows in rows_by_partition.items():
+                    if table not in self._partitions:
+                        for create_sql in _partition_create_sql(table):
+                            conn.execute(create_sql)
+                        created.append(table)
+                    conn.executemany(_insert_report_sql(table), rows)
+                conn.execute(UPDATE_SEQUENCE_SQL, (last_id + len(reports),))
+                self._update_rollups(conn, reports)
+                inserted = time.perf_counter()
+            committed = time.perf_counter()
+            # Only remembered once the batch has committed
+            self._partitions.update(created)
+            self._changed()
+        metrics.DB_INSERT_SECONDS.observe(inserted - started)
+        metrics.DB_COMMIT_SECONDS.observe(committed - inserted)
+        metrics.DB_BATCH_REPORTS.observe(len(reports))
+
+    def _iter_partitions(self, conn: sqlite3.Connection, cutoff: int, fields: Tuple[str, ...],
+                         station: Optional[str], delta: bool, params: Tuple,
+                         chunk_size: int = settings.HISTORY_CHUNK_SIZE) -> Iterator[List[sqlite3.Row]]:
+        """
+        Run a history query against every partition that can hold reports newer than the cutoff.
+
+        :param conn: Read connection inside a read transaction
+        :param cutoff: Epoch seconds the query starts from
+        :param fields: Columns to select
+        :param station: Station filter, or None for all stations
+        :param delta: Whether this is an id range (delta) query
+        :param params: Query parameters, the same for every partition
+        :param chunk_size: Maximum number of rows fetched at a time
+        :return: Generator of row lists, oldest partition first
+        """
+        for (table,) in conn.execute(SELECT_PARTITIONS_SQL, (_partition_name(cutoff),)).fetchall():
+            cursor = conn.execute(_history_sql(table, fields, station is not None, delta), params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    def get_yesterday_data(self, hours_ago: int = 24, station: Optional[str] = None,
+                           fields: Optional[Iterable[str]] = None) -> List[Dict]:
         """
         Get weather data from the last N hours.
 
+        Only the monthly partitions the range overlaps are queried.
+
         :param hours_ago: Number of hours to look back (default 24)
+        :param station: Only return reports from this station PASSKEY (default all stations)
+        :param fields: Columns to return (default DEFAULT_REPORT_FIELDS); id and timestamp are always included
         :return: List of weather report dictionaries
+        :raises ValueError: If a requested field doesn't exist
+        """
+        fields = report_fields(fields)
+        cutoff = _epoch(datetime.now() - timedelta(hours=hours_ago))
+        params = (cutoff,) if station is None else (station, cutoff)
+        with self._read_snapshot() as conn:
+            return [
+                dict(row)
+                for rows in self._iter_partitions(conn, cutoff, fields, station, False, params)
+                for row in rows
+            ]
+
+    def get_history_since(self, since_id: Optional[int], hours_ago: int = 24,
+                          station: Optional[str] = None,
+                          fields: Optional[Iterable[str]] = None) -> Tuple[List[Dict], int]:
         """
-        cutoff = (datetime.now() - timedelta(hours=hours_ago)).isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute('''
-                SELECT * FROM weather_reports
-                WHERE timestamp > ?
-                ORDER BY timestamp ASC
-            ''', (cutoff,))
-            return [dict(row) for row in cursor.fetchall()]
+        Get reports stored after a cursor, for incremental sync.
+
+        The cursor is the highest report id the caller has seen. Without one, or
+        when it is ahead of the newest stored report (the database was replaced),
+        the whole window is returned and the caller should discard what it holds.
+        The newest id and the rows are read in one snapshot, so the next cursor
+        never skips a report.
 
-    def cleanup_old_data(self, days_to_keep: int = 30):
+        :param since_id: Cursor returned by the previous call, or None for a full fetch
+        :param hours_ago: Number of hours to look back (default 24)
+        :param station: Only return reports from this station PASSKEY (default all stations)
+        :param fields: Columns to return (default DEFAULT_REPORT_FIELDS); id and timestamp are always included
+        :return: Tuple of (list of weather report dictionaries, next cursor)
+        :raises ValueError: If a requested field doesn't exist
+        """
+        chunks = self.iter_history_since(since_id, hours_ago, station, fields, stream=False)
+        max_id = next(chunks)
+        return [dict(row) for rows in chunks for row in rows], max_id
+
+    def iter_history_since(self, since_id: Optional[int], hours_ago: int = 24,
+                           station: Optional[str] = None,
+                           fields: Optional[Iterable[str]] = None,
+                           chunk_size: int = settings.HISTORY_CHUNK_SIZE,
+                           stream: bool = True) -> Iterator:
+        """
+        Stream the rows get_history_since() would return, a chunk at a time.
+
+        The first item generated is the next cursor; every item after that is a
+        list of at most chunk_size rows, with values in report_fields(fields)
+        order. A read connection (and its snapshot) is held until the generator
+        is exhausted or closed.
+
+        :param since_id: Cursor returned by a previous call, or None for a full fetch
+        :param hours_ago: Number of hours to look back (default 24)
+        :param station: Only return reports from this station PASSKEY (default all stations)
+        :param fields: Columns to return (default DEFAULT_REPORT_FIELDS); id and timestamp are always included
+        :param chunk_size: Maximum number of rows per chunk
+        :param stream: Read on a connection reserved for streamed responses (see DB_STREAM_POOL_SIZE)
+        :return: Generator of the next cursor followed by row lists
+        :raises ValueError: If a requested field doesn't exist (on the first next())
+        :raises DatabaseBusy: If no read connection is free (on the first next())
+        """
+        fields = report_fields(fields)
+        cutoff = _epoch(datetime.now() - timedelta(hours=hours_ago))
+        with self._read_snapshot(stream) as conn:
+            max_id = conn.execute(SELECT_MAX_ID_SQL).fetchone()[0]
+            yield max_id
+            if since_id is None or since_id > max_id:
+                params = (cutoff,) if station is None else (station, cutoff)
+                yield from self._iter_partitions(conn, cutoff, fields, station, False, params, chunk_size)
+            else:
+                params = (since_id, max_id, cutoff) if station is None else (since_id, max_id, cutoff, station)
+                yield from self._iter_partitions(conn, cutoff, fields, station, True, params, chunk_size)
+
+    def get_rollup_data(self, resolution: str, hours_ago: int = 24,
+                        station: Optional[str] = None,
+                        fields: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Get pre-aggregated weather data from the last N hours.
+
+        Each row covers one bucket and holds the mean of each metric under the
+        metric's own name, plus <metric>_min, <metric>_max, <metric>_last,
+        the number of samples and the rainfall total (rain_mm).
+
+        :param resolution: Rollup resolution, one of ROLLUP_RESOLUTIONS
+        :param hours_ago: Number of hours to look back (default 24)
+        :param station: Only return buckets for this station PASSKEY (default all stations)
+        :param fields: Metrics (or rain_mm) to return (default all of ROLLUP_FIELDS)
+        :return: List of rollup bucket dictionaries, oldest first
+        :raises ValueError: If a requested field doesn't exist
+        """
+        chunks = self.iter_rollup_data(resolution, hours_ago, station, fields, stream=False)
+        return [dict(row) for rows in chunks for row in rows]
+
+    def iter_rollup_data(self, resolution: str, hours_ago: int = 24,
+                         station: Optional[str] = None,
+                         fields: Optional[Iterable[str]] = None,
+                         chunk_size: int = settings.HISTORY_CHUNK_SIZE,
+                         stream: bool = True) -> Iterator[List[sqlite3.Row]]:
+        """
+        Stream the rows get_rollup_data() would return, a chunk at a time.
+
+        Values are in rollup_columns(fields) order. A read connection is held
+        until the generator is exhausted or closed.
+
+        :param resolution: Rollup resolution, one of ROLLUP_RESOLUTIONS
+        :param hours_ago: Number of hours to look back (default 24)
+        :param station: Only return buckets for this station PASSKEY (default all stations)
+        :param fields: Metrics (or rain_mm) to return (default all of ROLLUP_FIELDS)
+        :param chunk_size: Maximum number of rows per chunk
+        :param stream: Read on a connection reserved for streamed responses (see DB_STREAM_POOL_SIZE)
+        :return: Generator of row lists, oldest first
+        :raises ValueError: If a requested field doesn't exist (on the first next())
+        :raises DatabaseBusy: If no read connection is free (on the first next())
+        """
+        cutoff = _bucket_start(datetime.now() - timedelta(hours=hours_ago), ROLLUP_RESOLUTIONS[resolution])
+        sql = _rollup_select_sql(f'weather_rollup_{resolution}', station is not None, rollup_fields(fields))
+        with self._read_connection(stream) as conn:
+            if station is None:
+                cursor = conn.execute(sql, (_epoch(cutoff),))
+            else:
+                cursor = conn.execute(sql, (station, _epoch(cutoff)))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+
+    def delete_expired(self, table: str, cutoff: int, batch_size: int = settings.RETENTION_BATCH_SIZE) -> int:
+        """
+        Delete one batch of rows older than a cutoff.
+
+        :param table: Table to prune, one of RETENTION_COLUMNS
+        :param cutoff: Epoch seconds; rows timestamped before this are deleted
+        :param batch_size: Maximum number of rows deleted in this transaction
+        :return: Number of rows deleted; fewer than batch_size means nothing expired is left
+        """
+        with self._write_lock:
+            with self._writer as conn:
+                deleted = conn.execute(DELETE_EXPIRED_SQL[table], (cutoff, batch_size)).rowcount
+            if deleted:
+                self._changed()
+        return deleted
+
+    def reclaim_space(self, max_pages: int = settings.RETENTION_VACUUM_PAGES):
+        """
+        Return free pages to the filesystem and truncate the write-ahead log.
+
+        Databases created before incremental auto-vacuum was enabled keep their
+        free pages for reuse until migrate.py has been run on them.
+
+        :param max_pages: Maximum number of free pages released in one call
+        """
+        with self._write_lock:
+            # executescript() steps the pragma to completion; execute() would free a single page
+            self._writer.executescript(f'PRAGMA incremental_vacuum({int(max_pages)})')
+            self._writer.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+
+    def drop_partitions(self, cutoff: int) -> int:
+        """
+        Drop every monthly partition that ends before a cutoff.
+
+        The partition the cutoff falls in is kept whole, so raw reports are
+        retained for up to a month longer than asked.
+
+        :param cutoff: Epoch seconds; partitions holding only older reports are dropped
+        :return: Number of reports dropped
+        """
+        dropped = 0
+        with self._write_lock:
+            with self._writer as conn:
+                expired = conn.execute(SELECT_EXPIRED_PARTITIONS_SQL, (_partition_name(cutoff),)).fetchall()
+                for (table,) in expired:
+                    dropped += conn.execute(f'SELECT count(*) FROM {table}').fetchone()[0]
+                    conn.execute(f'DROP TABLE {table}')
+            self._partitions.difference_update(table for (table,) in expired)
+            if expired:
+                self._changed()
+        return dropped
+
+    def cleanup_old_data(self, days_to_keep: int = 30) -> int:
         """
         Delete weather data older than specified days.
 
+        Whole monthly partitions are dropped, see drop_partitions().
+
         :param days_to_keep: Number of days to retain (default 30)
+        :return: Number of rows deleted
         """
-        cutoff = (datetime.now() - timedelta(days=days_to_keep)).isoformat()
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('DELETE FROM weather_reports WHERE timestamp < ?', (cutoff,))
-            deleted_count = cursor.rowcount
-            conn.commit()
-            return deleted_count
+        return self.drop_partitions(_epoch(datetime.now() - timedelta(days=days_to_keep)))
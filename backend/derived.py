@@ -0,0 +1,124 @@
+"""
+Derived weather metrics, maintained as reports arrive.
+
+Dew point and apparent ("feels like") temperature come from the report
+itself. Today's temperature extremes and rainfall since local midnight are
+running values kept per station and reset when the day changes, so each
+report costs a few comparisons rather than a scan of the day's history.
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional
+
+from report import WeatherReport
+
+# Magnus formula coefficients (Alduchov & Eskridge), valid from -40 to 50 °C
+_MAGNUS_B = 17.625
+_MAGNUS_C = 243.04
+
+
+def dew_point(temp_c: Optional[float], humidity: Optional[float]) -> Optional[float]:
+    """
+    Dew point from temperature and relative humidity.
+
+    :param temp_c: Air temperature (°C)
+    :param humidity: Relative humidity (%)
+    :return: Dew point (°C), or None if either input is missing or humidity isn't positive
+    """
+    if temp_c is None or humidity is None or humidity <= 0:
+        return None
+    gamma = math.log(min(humidity, 100) / 100) + _MAGNUS_B * temp_c / (_MAGNUS_C + temp_c)
+    return round(_MAGNUS_C * gamma / (_MAGNUS_B - gamma), 1)
+
+
+def apparent_temperature(temp_c: Optional[float], humidity: Optional[float],
+                         wind_speed_kmh: Optional[float]) -> Optional[float]:
+    """
+    Apparent ("feels like") temperature, using the Steadman formula the Bureau of Meteorology publishes.
+
+    :param temp_c: Air temperature (°C)
+    :param humidity: Relative humidity (%)
+    :param wind_speed_kmh: Wind speed (km/h); calm if missing
+    :return: Apparent temperature (°C), or None if temperature or humidity is missing
+    """
+    if temp_c is None or humidity is None:
+        return None
+    vapour_pressure = humidity / 100 * 6.105 * math.exp(17.27 * temp_c / (237.7 + temp_c))
+    wind_ms = (wind_speed_kmh or 0.0) / 3.6
+    return round(temp_c + 0.33 * vapour_pressure - 0.70 * wind_ms - 4.00, 1)
+
+
+@dataclass(slots=True)
+class _Day:
+    """Running values for one station's current day."""
+
+    # Epoch seconds of the next local midnight, when the values reset
+    ends: float
+    temp_min_c: Optional[float] = None
+    temp_max_c: Optional[float] = None
+    rain_mm: float = 0.0
+
+
+def _next_midnight(received: float) -> float:
+    """Epoch seconds of the local midnight after a time."""
+    day = datetime.fromtimestamp(received).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (day + timedelta(days=1)).timestamp()
+
+
+class DerivedMetrics:
+    """Fills in the derived fields of each report, keeping per-station state for the day."""
+
+    def __init__(self, default_interval: float = 60):
+        """
+        :param default_interval: Reporting interval (seconds) assumed for rainfall when a report has none
+        """
+        self.default_interval = default_interval
+        self._days: Dict[Optional[str], _Day] = {}
+
+    def seed(self, rollups: Iterable[Dict]):
+        """
+        Start today's running values from stored data, e.g. after a restart.
+
+        :param rollups: Today's daily rollup rows (see WeatherDatabase.get_rollup_data()),
+                        with temp_c_min, temp_c_max and rain_mm
+        """
+        ends = _next_midnight(datetime.now().timestamp())
+        for row in rollups:
+            self._days[row.get('station') or None] = _Day(
+                ends=ends,
+                temp_min_c=row.get('temp_c_min'),
+                temp_max_c=row.get('temp_c_max'),
+                rain_mm=row.get('rain_mm') or 0.0,
+            )
+
+    def apply(self, report: WeatherReport):
+        """
+        Set a report's derived fields and fold it into its station's day.
+
+        :param report: Parsed report, already stamped with its receive time
+        """
+        report.dew_point_c = dew_point(report.temp_c, report.humidity)
+        report.feels_like_c = apparent_temperature(report.temp_c, report.humidity, report.wind_speed_kmh)
+
+        day = self._days.get(report.station)
+        if day is None or report.received >= day.ends:
+            day = self._days[report.station] = _Day(ends=_next_midnight(report.received))
+
+        temp_c = report.temp_c
+        if temp_c is not None:
+            if day.temp_min_c is None or temp_c < day.temp_min_c:
+                day.temp_min_c = temp_c
+            if day.temp_max_c is None or temp_c > day.temp_max_c:
+                day.temp_max_c = temp_c
+        report.temp_min_c = day.temp_min_c
+        report.temp_max_c = day.temp_max_c
+
+        # Rainfall estimated from rate and interval, like the rollups; the station's own
+        # daily total is used instead when it sends one
+        day.rain_mm += (report.rain_rate_mm or 0.0) * (report.interval or self.default_interval) / 3600
+        daily_rain_in = report.fields.get('dailyrainin')
+        try:
+            report.rain_today_mm = round(float(daily_rain_in) * 25.4, 2)
+        except (TypeError, ValueError):
+            report.rain_today_mm = round(day.rain_mm, 2)
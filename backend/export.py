@@ -0,0 +1,59 @@
+"""
+Streaming text encodings for history responses.
+
+Rows are encoded a chunk at a time as they come off the database cursor, so
+the response starts straight away and the backend never holds the whole range
+in memory, however large it is.
+
+NDJSON is one JSON object per line. CSV has a header row followed by one row
+per record, with missing values left empty.
+"""
+import csv
+import io
+import json
+from typing import Callable, Dict, Iterable, Iterator, Sequence
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+
+def encode_ndjson(columns: Sequence[str], chunks: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    """
+    Encode rows as newline-delimited JSON.
+
+    :param columns: Column names, in the order of each row's values
+    :param chunks: Lists of rows
+    :return: Generator of encoded chunks
+    """
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(dict(zip(columns, row)), separators=(',', ':')) + '\n' for row in rows
+        ).encode()
+
+
+def encode_csv(columns: Sequence[str], chunks: Iterable[Sequence[Sequence]]) -> Iterator[bytes]:
+    """
+    Encode rows as CSV with a header row.
+
+    :param columns: Column names, in the order of each row's values
+    :param chunks: Lists of rows
+    :return: Generator of encoded chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty result
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+# Media type -> encoder, for content negotiation
+ENCODERS: Dict[str, Callable[[Sequence[str], Iterable[Sequence[Sequence]]], Iterator[bytes]]] = {
+    NDJSON_MEDIA_TYPE: encode_ndjson,
+    CSV_MEDIA_TYPE: encode_csv,
+}
@@ -0,0 +1,114 @@
+"""
+Write-behind ingestion queue for weather reports.
+
+Reports are accepted into a bounded in-memory queue and written to SQLite by a
+background task in batched transactions, flushing when a batch fills up or the
+flush interval elapses.
+"""
+import asyncio
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+import logs
+import metrics
+import settings
+from database import WeatherDatabase
+from report import WeatherReport
+
+# Marks the end of the queue during shutdown
+_STOP = object()
+
+logger = logs.get_logger("ingest")
+
+
+class IngestQueue:
+    """Buffers incoming reports and writes them to the database in batches."""
+
+    def __init__(self, db: WeatherDatabase,
+                 max_size: int = settings.INGEST_QUEUE_SIZE,
+                 batch_size: int = settings.INGEST_BATCH_SIZE,
+                 flush_interval: float = settings.INGEST_FLUSH_INTERVAL):
+        """
+        Initialize the queue. Call start() from a running event loop before use.
+
+        :param db: Database the reports are written to
+        :param max_size: Maximum number of reports buffered before put() waits
+        :param batch_size: Maximum number of reports written per transaction
+        :param flush_interval: Seconds to wait for a batch to fill before writing it
+        """
+        self.db = db
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def depth(self) -> int:
+        """
+        Number of reports waiting to be written.
+
+        :return: Current queue depth
+        """
+        return self._queue.qsize() if self._queue else 0
+
+    async def start(self):
+        """Start the background writer task."""
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush everything still queued and stop the background writer."""
+        if self._task is None:
+            return
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def put(self, report: WeatherReport):
+        """
+        Queue a report for writing, stamped with the time it was received.
+
+        Waits for space if the queue is full, so a stalled writer applies
+        backpressure to the station instead of growing memory without bound.
+
+        :param report: Parsed report
+        """
+        await self._queue.put((datetime.now(), report))
+
+    async def _run(self):
+        """Drain the queue in batches until the stop marker is reached."""
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is _STOP:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._write(batch)
+
+    async def _write(self, batch: List[Tuple[datetime, WeatherReport]]):
+        """
+        Write a batch in a worker thread so the event loop keeps serving requests.
+
+        :param batch: List of (received timestamp, report) tuples
+        """
+        try:
+            await asyncio.to_thread(self.db.insert_reports, batch)
+        except Exception as e:
+            metrics.INGEST_FAILED_REPORTS_TOTAL.inc(amount=len(batch))
+            logger.error("Failed to write weather reports", extra={"fields": {"reports": len(batch), "error": e}})
@@ -0,0 +1,156 @@
+"""
+Non-blocking structured logging for the backend.
+
+Records are handed to a bounded in-memory queue by a QueueHandler and written
+out by a QueueListener thread, so request handlers never wait on a slow
+terminal or pipe. If output falls so far behind that the queue fills, new
+records are dropped rather than blocking.
+
+Structured fields are passed as extra={"fields": {...}} and rendered as
+key=value pairs (LOG_FORMAT "text") or one JSON object per line ("json").
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional, TextIO
+
+import settings
+
+# Parent of every backend logger; see get_logger()
+LOGGER_NAME = "weather"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.Handler] = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats a record and its structured fields as key=value text or a JSON object."""
+
+    def __init__(self, json_output: bool = False):
+        """
+        :param json_output: Emit one JSON object per record instead of key=value text
+        """
+        super().__init__()
+        self.json_output = json_output
+
+    def format(self, record: logging.LogRecord) -> str:
+        timestamp = datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')
+        fields: Dict = getattr(record, 'fields', None) or {}
+        message = record.getMessage()
+        if self.json_output:
+            return json.dumps({
+                'time': timestamp,
+                'level': record.levelname,
+                'logger': record.name,
+                'message': message,
+                **fields,
+            }, default=str)
+
+        pairs = ' '.join(f"{key}={_logfmt_value(value)}" for key, value in fields.items())
+        line = f"{timestamp} {record.levelname:<7} {record.name} {message}"
+        return f"{line} {pairs}" if pairs else line
+
+
+def _logfmt_value(value) -> str:
+    """Render a field value, quoting it when it contains spaces, quotes or equals signs."""
+    text = str(value)
+    if not text or any(char in text for char in ' "='):
+        return json.dumps(text)
+    return text
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking or erroring when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class StationSampler:
+    """Lets through at most one event per station per interval."""
+
+    def __init__(self, interval: float):
+        """
+        :param interval: Minimum seconds between events for one station (0 lets everything through)
+        """
+        self.interval = interval
+        self._last: Dict[Optional[str], float] = {}
+        self._lock = threading.Lock()
+
+    def allow(self, station: Optional[str]) -> bool:
+        """
+        Whether an event for this station should be logged now.
+
+        :param station: Station PASSKEY
+        :return: True if the station's interval has passed since its last logged event
+        """
+        now = time.monotonic()
+        with self._lock:
+            last = self._last.get(station)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last[station] = now
+            return True
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Get a backend logger.
+
+    :param name: Component name, e.g. "ingest"
+    :return: Logger under the backend's parent logger
+    """
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+def start(level: str = settings.LOG_LEVEL, log_format: str = settings.LOG_FORMAT,
+          queue_size: int = settings.LOG_QUEUE_SIZE, stream: Optional[TextIO] = None):
+    """
+    Start writing backend log records from a background thread.
+
+    :param level: Minimum level logged, e.g. "INFO"
+    :param log_format: "text" for key=value lines or "json" for JSON lines
+    :param queue_size: Records buffered before new ones are dropped
+    :param stream: Where records are written (default stderr)
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(StructuredFormatter(json_output=log_format == "json"))
+    log_queue = queue.Queue(maxsize=queue_size)
+    _handler = _DroppingQueueHandler(log_queue)
+
+    parent = logging.getLogger(LOGGER_NAME)
+    parent.setLevel(level.upper())
+    parent.addHandler(_handler)
+    parent.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, output)
+    _listener.start()
+
+
+def stop():
+    """Write out everything still queued and stop the background thread."""
+    global _listener, _handler
+    if _listener is None:
+        return
+    logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+    _listener.stop()
+    if _handler.dropped:
+        print(f"{_handler.dropped} log records were dropped because output could not keep up", file=sys.stderr)
+    _listener = None
+    _handler = None
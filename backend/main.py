@@ -5,14 +5,116 @@ Weather API backend.
 
 Receives weather data from an ECOWITT WS2910 weather station and serves it via REST endpoints.
 """
-from fastapi import FastAPI, Request
-import datetime
-from database import WeatherDatabase
+import asyncio
+import logging
+import signal
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
+from itertools import chain, count
+from typing import Callable, Dict, Iterable, Iterator, Optional
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+import settings
+from database import (DEFAULT_INTERVAL_SECONDS, ROLLUP_RESOLUTIONS, DatabaseBusy, WeatherDatabase,
+                      report_fields, rollup_columns)
+import columnar
+from derived import DerivedMetrics
+import export
+import logs
+import metrics
+from ingest import IngestQueue
+from recommendations import RecommendationEngine
+from report import WeatherReport, parse_fields, parse_report
+from retention import RetentionScheduler
+from stream import ReportBroadcaster, encode_event
 
-app = FastAPI()
-db = WeatherDatabase()
+db = WeatherDatabase(settings.DB_PATH)
+ingest_queue = IngestQueue(db)
+metrics.INGEST_QUEUE_DEPTH.set_function(ingest_queue.depth)
+retention = RetentionScheduler(db)
+broadcaster = ReportBroadcaster()
+recommendation_engine = RecommendationEngine(db.get_yesterday_data)
+derived_metrics = DerivedMetrics(DEFAULT_INTERVAL_SECONDS)
 
-latest_report = {}
+logger = logs.get_logger("reports")
+report_sampler = logs.StationSampler(settings.LOG_REPORT_SAMPLE_SECONDS)
+
+# Metric fields included in sampled report log lines
+REPORT_LOG_FIELDS = ('temp_c', 'humidity', 'uv', 'wind_speed_kmh', 'rain_rate_mm', 'pressure_hpa')
+
+# Distinguishes validators from earlier runs, whose version stamps started from the same numbers
+INSTANCE = format(time.time_ns(), 'x')
+STARTED = time.time()
+report_versions = count(1)
+
+# Most recent report from any station, plus the most recent report per station PASSKEY
+latest_report: Optional[WeatherReport] = None
+latest_by_station: Dict[str, WeatherReport] = {}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the log writer, the background report writer and the retention task,
+    and picks up today's extremes and rainfall from the daily rollups. On
+    shutdown, stops retention, flushes any queued reports, closes the database
+    connections and writes out remaining log records. Open report streams are
+    ended as soon as a shutdown signal arrives; see close_streams_on_exit().
+    """
+    logs.start()
+    await ingest_queue.start()
+    await retention.start()
+    derived_metrics.seed(db.get_rollup_data('1d', 0, fields=('temp_c', 'rain_mm')))
+    restore_signals = close_streams_on_exit(asyncio.get_running_loop())
+    yield
+    restore_signals()
+    broadcaster.close()
+    await retention.stop()
+    await ingest_queue.stop()
+    db.close()
+    logs.stop()
+
+
+def close_streams_on_exit(loop: asyncio.AbstractEventLoop) -> Callable[[], None]:
+    """
+    End open report streams as soon as the server is told to stop.
+
+    uvicorn waits for open connections to close before running the lifespan
+    shutdown, and a live stream never closes by itself, so streams have to end
+    when the signal arrives rather than in the shutdown above. The server's own
+    signal handlers still run afterwards.
+
+    :param loop: Event loop the streams run on
+    :return: Function that puts the previous signal handlers back
+    """
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        return lambda: None
+
+    previous = {}
+
+    def handle_exit(sig, frame):
+        loop.call_soon_threadsafe(broadcaster.close)
+        handler = previous[sig]
+        if callable(handler):
+            handler(sig, frame)
+        elif handler == signal.SIG_DFL:
+            signal.signal(sig, handler)
+            signal.raise_signal(sig)
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        previous[sig] = signal.signal(sig, handle_exit)
+
+    def restore():
+        for sig, handler in previous.items():
+            signal.signal(sig, handler)
+    return restore
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/data/report")
 async def report(request: Request):
@@ -56,25 +158,119 @@ async def report(request: Request):
         wh65batt: Sensor battery (0=OK, 1=low)
     """
     global latest_report
-    form_data = await request.form()
-    imperial_data = dict(form_data)
+    # Console uploads are url-encoded; anything else goes through the general form parser
+    with metrics.REPORT_PARSE_SECONDS.time():
+        if request.headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+            report_data = parse_report(await request.body())
+        else:
+            report_data = parse_fields((await request.form()).items())
+    report_data.version = next(report_versions)
+    report_data.received = time.time()
+    derived_metrics.apply(report_data)
+    metrics.REPORTS_TOTAL.inc(report_data.station or '')
+    latest_report = report_data
+    latest_by_station[report_data.station] = report_data
 
-    # Convert to metric units
-    metric_data = convert_imperial_to_metric(imperial_data)
-    latest_report = metric_data
+    # Queue for the background writer; batched into the database off the event loop
+    await ingest_queue.put(report_data)
 
-    # Store in database
-    db.insert_report(metric_data)
+    # Push to live stream subscribers and refresh server-side recommendations
+    broadcaster.publish(report_data.station, report_data)
+    recommendation_engine.observe(report_data.station, report_data)
 
-    display_latest()
+    log_report(report_data)
     return {"status": "received"}
     
 @app.get("/data/latest")
-async def get_latest_report():
+async def get_latest_report(request: Request, station: Optional[str] = None):
     """
     GET request endpoint to return the raw latest weather station report.
+
+    Alongside the values as sent and their metric conversions, the report carries
+    dew_point_c, feels_like_c and today's temp_min_c, temp_max_c and rain_today_mm.
+
+    Sends ETag and Last-Modified headers for the report; a conditional request for a
+    report the client already has gets 304 Not Modified without a body.
+
+    :param station: Station PASSKEY to return the report for (default: whichever station reported last)
+    """
+    if station is None:
+        report_data = latest_report
+    else:
+        report_data = latest_by_station.get(station)
+    if report_data is None:
+        headers = validators(f'"{INSTANCE}-0"', STARTED)
+    else:
+        headers = validators(f'"{INSTANCE}-{report_data.version}"', report_data.received)
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+    content = report_data.as_json() if report_data is not None else '{}'
+    return Response(content=content, media_type="application/json", headers=headers)
+
+@app.get("/data/stream")
+async def stream_reports(station: Optional[str] = None):
+    """
+    GET request endpoint streaming new weather reports as Server-Sent Events.
+
+    Sends the current latest report straight away, then a "report" event for every
+    report received. A keepalive comment is sent when the stream is otherwise idle.
+
+    :param station: Station PASSKEY to follow (default: every station)
     """
-    return latest_report
+    queue = broadcaster.subscribe(station)
+    current = latest_report if station is None else latest_by_station.get(station)
+
+    async def events():
+        try:
+            if current is not None:
+                yield encode_event(current)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if event is None:
+                    break
+                yield event
+        finally:
+            broadcaster.unsubscribe(queue, station)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/data/recommendations")
+def get_recommendations(station: Optional[str] = None, profile: str = "default"):
+    """
+    GET request endpoint to return activity recommendations for the latest report.
+
+    Computed on the server from the threshold profiles in profiles.json, and cached
+    until the station's next report. Same shape as the tray's get_all_recommendations().
+
+    :param station: Station PASSKEY (default: whichever station reported last)
+    :param profile: Threshold profile name (default "default")
+    :return: Dictionary with status, reasons, score and prediction for each activity
+    """
+    latest = latest_report if station is None else latest_by_station.get(station)
+    try:
+        return recommendation_engine.get(station, profile, latest)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown profile: {profile}")
+    except DatabaseBusy:
+        raise database_busy()
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    GET request endpoint exposing backend metrics in the Prometheus text format.
+
+    Covers report parsing and conversion, database writes, history queries,
+    ingest queue depth and reports received per station.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/health")
 async def health():
@@ -87,65 +283,171 @@ async def health():
 
 
 @app.get("/data/history")
-async def get_history(hours: int = 24):
+def get_history(request: Request, hours: int = 24, station: Optional[str] = None,
+                resolution: str = "raw", since_id: Optional[int] = None,
+                fields: Optional[str] = None):
     """
     GET request endpoint to return historical weather data.
 
+    Declared sync so FastAPI runs the query in its threadpool rather than on the event loop.
+
+    Responds with JSON by default. Clients sending "Accept: application/vnd.weather.columnar"
+    get the packed columnar encoding described in columnar.py instead. "Accept: application/x-ndjson"
+    or "Accept: text/csv" stream the rows as they are read (see export.py), so large ranges
+    never sit in memory.
+
+    The ETag and Last-Modified headers change whenever stored data does. A conditional
+    request made when nothing has been stored or deleted since gets 304 Not Modified
+    without running the query. Rows that age out of the window without any new data
+    arriving don't change them; clients trim their copy to the window themselves.
+
     :param hours: Number of hours to look back (default 24)
+    :param station: Only return reports from this station PASSKEY (default all stations)
+    :param resolution: "raw" for every report, or a rollup resolution ("5m", "1h", "1d")
+                       for one pre-aggregated row per bucket
+    :param since_id: Cursor from a previous response's X-Next-Cursor header; only reports
+                     stored after it are returned (raw resolution only)
+    :param fields: Comma-separated columns to return, e.g. "temp_c,uv". Raw reports always
+                   include id and timestamp and leave out raw_data unless it is listed;
+                   rollups always include station, timestamp and samples.
     :return: List of historical weather reports
     """
-    return db.get_yesterday_data(hours)
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+    accept = request.headers.get("accept", "")
+    stream_type = next((media_type for media_type in export.ENCODERS if media_type in accept), None)
+    if resolution != "raw":
+        if since_id is not None:
+            raise HTTPException(status_code=400, detail="since_id is only supported with resolution=raw")
+        if resolution not in ROLLUP_RESOLUTIONS:
+            raise HTTPException(status_code=400, detail=f"Unknown resolution: {resolution}")
+
+    # Read before querying, so a commit during the query can only make the validators stale
+    media_type = stream_type or (columnar.MEDIA_TYPE if columnar.MEDIA_TYPE in accept else "application/json")
+    headers = validators(f'"{INSTANCE}-{db.version}-{media_type.rsplit("/", 1)[-1]}"', db.modified)
+    headers["Vary"] = "Accept"
+    if not_modified(request, headers):
+        return Response(status_code=304, headers=headers)
+
+    started = time.perf_counter()
+    try:
+        if stream_type and resolution == "raw":
+            columns = report_fields(field_list)
+            chunks = db.iter_history_since(since_id, hours, station, columns)
+            headers["X-Next-Cursor"] = str(next(chunks))
+        elif stream_type:
+            columns = rollup_columns(field_list)
+            chunks = db.iter_rollup_data(resolution, hours, station, field_list)
+            # Run the query now, so a busy database is reported before the response starts
+            chunks = chain([next(chunks, [])], chunks)
+        elif resolution == "raw":
+            records, next_cursor = db.get_history_since(since_id, hours, station, field_list)
+            headers["X-Next-Cursor"] = str(next_cursor)
+        else:
+            records = db.get_rollup_data(resolution, hours, station, field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DatabaseBusy:
+        raise database_busy()
+
+    if stream_type:
+        encoder = export.ENCODERS[stream_type]
+        chunks = observe_history(chunks, resolution, started)
+        return StreamingResponse(encoder(columns, chunks), media_type=stream_type, headers=headers)
+    metrics.HISTORY_QUERY_SECONDS.observe(time.perf_counter() - started, resolution)
+    metrics.HISTORY_ROWS.observe(len(records), resolution)
+    if media_type == columnar.MEDIA_TYPE:
+        return Response(content=columnar.encode(records), media_type=columnar.MEDIA_TYPE, headers=headers)
+    return JSONResponse(content=records, headers=headers)
 
 
-def convert_imperial_to_metric(imperial_data: dict) -> dict:
+def database_busy() -> HTTPException:
     """
-    Convert imperial units to metric.
+    Error for a request that found every read connection in use (see settings.DB_READ_TIMEOUT).
+
+    :return: 503 error asking the client to retry shortly
+    """
+    return HTTPException(status_code=503, detail="Database busy, try again shortly", headers={"Retry-After": "1"})
 
-    Converts:
-    - Temperature: Fahrenheit → Celsius
-    - Wind speed: mph → km/h
-    - Rain rate: in/hr → mm/hr
-    - Pressure: inHg → hPa
 
-    :param imperial_data: Dictionary with imperial units from weather station
-    :return: Dictionary with metric units
+def validators(etag: str, last_modified: float) -> Dict[str, str]:
     """
-    metric_data = imperial_data.copy()
+    Build the caching headers for a response.
 
-    # Temperature: F → C
-    if 'tempf' in imperial_data:
-        metric_data['temp_c'] = round((float(imperial_data['tempf']) - 32) / 1.8, 1)
+    :param etag: Quoted entity tag
+    :param last_modified: Epoch seconds the content last changed
+    :return: ETag, Last-Modified and Cache-Control headers
+    """
+    return {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        # Clients may keep a copy, but must check it is current before using it
+        "Cache-Control": "no-cache",
+    }
 
-    # Wind speed: mph → km/h
-    if 'windspeedmph' in imperial_data:
-        metric_data['wind_speed_kmh'] = round(float(imperial_data['windspeedmph']) * 1.609344, 1)
 
-    # Rain rate: in/hr → mm/hr
-    if 'rainratein' in imperial_data:
-        metric_data['rain_rate_mm'] = round(float(imperial_data['rainratein']) * 25.4, 2)
+def not_modified(request: Request, headers: Dict[str, str]) -> bool:
+    """
+    Whether a conditional request already has the current content.
 
-    # Pressure: inHg → hPa
-    if 'baromrelin' in imperial_data:
-        metric_data['pressure_hpa'] = round(float(imperial_data['baromrelin']) * 33.8639, 1)
+    If-None-Match is compared with the ETag. Only when it is absent is If-Modified-Since
+    compared with Last-Modified, at the one second resolution of HTTP dates.
 
-    # Copy direct values (no conversion needed)
-    for key in ['humidity', 'uv', 'winddir', 'solarradiation']:
-        if key in imperial_data:
-            metric_data[key.replace('dir', '_dir')] = imperial_data[key]
+    :param request: Incoming request
+    :param headers: Headers from validators() for the current content
+    :return: True if a 304 Not Modified response should be sent
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or headers["ETag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        # "-0000" dates parse as naive; HTTP dates are always UTC
+        since = since.replace(tzinfo=timezone.utc)
+    return parsedate_to_datetime(headers["Last-Modified"]) <= since
 
-    return metric_data
 
+def observe_history(chunks: Iterable[list], resolution: str, started: float) -> Iterator[list]:
+    """
+    Pass streamed history chunks through, recording query time and rows once the stream ends.
 
-def display_latest():
+    :param chunks: Row lists from the database
+    :param resolution: History resolution, used as the metric label
+    :param started: perf_counter() value when the request started
+    :return: Generator of the same row lists
     """
-    Displays the latest weather data to the terminal.
+    rows = 0
+    try:
+        for chunk in chunks:
+            rows += len(chunk)
+            yield chunk
+    finally:
+        metrics.HISTORY_QUERY_SECONDS.observe(time.perf_counter() - started, resolution)
+        metrics.HISTORY_ROWS.observe(rows, resolution)
 
-    When the backend receives POST data from the weather station, it is stored in a global variable
-    and then printed to the terminal for debugging purposes.
+
+def log_report(report_data: WeatherReport):
     """
-    date = datetime.datetime.now()
-    print(f"\n[{date}] Latest weather data:")
-    for key,value in latest_report.items():
-        print(f"{key}: {value}")
+    Logs a received report.
+
+    Every report is logged with all of its fields when LOG_FULL_REPORTS is set.
+    Otherwise a one-line summary is logged per station at most once every
+    LOG_REPORT_SAMPLE_SECONDS. Records are written by a background thread (see logs.py).
 
-    
\ No newline at end of file
+    :param report_data: Parsed report
+    """
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    if settings.LOG_FULL_REPORTS:
+        logger.info("Report received", extra={"fields": report_data.as_dict()})
+    elif report_sampler.allow(report_data.station):
+        fields = {"station": report_data.station}
+        fields.update((key, getattr(report_data, key)) for key in REPORT_LOG_FIELDS
+                      if getattr(report_data, key) is not None)
+        logger.info("Report received", extra={"fields": fields})
@@ -0,0 +1,212 @@
+"""
+Lightweight Prometheus metrics for the backend's hot paths.
+
+Histograms, counters and gauges rendered in the Prometheus text exposition
+format by the /metrics endpoint. Recording a value is a bisect and a couple of
+additions under a lock, cheap enough to leave on in production.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Bucket upper bounds, in seconds, for latency histograms (100µs to 10s)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Bucket upper bounds for row and batch counts
+COUNT_BUCKETS = (1, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000, 1000000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text format."""
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    """Render a label set, e.g. {station="A",le="0.1"}."""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing .0."""
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Histogram:
+    """Distribution of observed values in fixed buckets, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = LATENCY_BUCKETS,
+                 label_names: Sequence[str] = ()):
+        """
+        :param name: Metric name
+        :param documentation: HELP text
+        :param buckets: Bucket upper bounds, ascending
+        :param label_names: Names of the labels passed to observe()
+        """
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        # Label values -> [per-bucket counts (last is +Inf), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        """
+        Record one value.
+
+        :param value: Observed value
+        :param label_values: One value per label name, in order
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Observe how long the block takes, in seconds."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def render(self) -> List[str]:
+        """Render the metric in the text format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else _format_value(bound)
+                label_set = _format_labels(self.label_names, labels, f'le="{le}"')
+                lines.append(f'{self.name}_bucket{label_set} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+class Counter:
+    """Monotonically increasing count, optionally split by labels."""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        """
+        :param name: Metric name (by convention ending in _total)
+        :param documentation: HELP text
+        :param label_names: Names of the labels passed to inc()
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        """
+        Add to the count.
+
+        :param label_values: One value per label name, in order
+        :param amount: Amount to add
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        """Render the metric in the text format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.label_names:
+            values = [((), 0)]
+        for labels, value in values:
+            lines.append(f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}')
+        return lines
+
+
+class Gauge:
+    """Current value read from a callback at scrape time."""
+
+    def __init__(self, name: str, documentation: str):
+        """
+        :param name: Metric name
+        :param documentation: HELP text
+        """
+        self.name = name
+        self.documentation = documentation
+        self._function: Optional[Callable[[], float]] = None
+
+    def set_function(self, function: Callable[[], float]):
+        """
+        Set the callback that supplies the value.
+
+        :param function: Called on every scrape
+        """
+        self._function = function
+
+    def render(self) -> List[str]:
+        """Render the metric in the text format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} gauge']
+        if self._function is not None:
+            lines.append(f'{self.name} {_format_value(float(self._function()))}')
+        return lines
+
+
+REPORT_PARSE_SECONDS = Histogram(
+    'weather_report_parse_seconds', 'Time to read a report body, parse it and convert it to metric units.')
+REPORTS_TOTAL = Counter(
+    'weather_reports_total', 'Reports received, by station PASSKEY.', ('station',))
+INGEST_QUEUE_DEPTH = Gauge(
+    'weather_ingest_queue_depth', 'Reports waiting for the background writer.')
+INGEST_FAILED_REPORTS_TOTAL = Counter(
+    'weather_ingest_failed_reports_total', 'Reports lost because their batch failed to write.')
+DB_INSERT_SECONDS = Histogram(
+    'weather_db_insert_seconds', 'Time to insert a batch of reports and update rollups, before commit.')
+DB_COMMIT_SECONDS = Histogram(
+    'weather_db_commit_seconds', 'Time to commit a batch of reports.')
+DB_BATCH_REPORTS = Histogram(
+    'weather_db_batch_reports', 'Reports written per transaction.', COUNT_BUCKETS)
+HISTORY_QUERY_SECONDS = Histogram(
+    'weather_history_query_seconds',
+    'Time to read a /data/history result (until the last row is sent, when streamed), by resolution.',
+    label_names=('resolution',))
+HISTORY_ROWS = Histogram(
+    'weather_history_rows', 'Rows returned by /data/history, by resolution.', COUNT_BUCKETS, ('resolution',))
+
+REGISTRY = [
+    REPORT_PARSE_SECONDS,
+    REPORTS_TOTAL,
+    INGEST_QUEUE_DEPTH,
+    INGEST_FAILED_REPORTS_TOTAL,
+    DB_INSERT_SECONDS,
+    DB_COMMIT_SECONDS,
+    DB_BATCH_REPORTS,
+    HISTORY_QUERY_SECONDS,
+    HISTORY_ROWS,
+]
+
+
+def render() -> str:
+    """
+    Render every registered metric.
+
+    :return: Metrics in the Prometheus text exposition format
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,58 @@
+"""
+Bulk migration command for existing weather databases.
+
+Brings a database up to the current schema in one pass (the same upgrade the
+backend runs on startup), then compacts it and refreshes query planner statistics.
+Compacting also switches older databases to incremental auto-vacuum, so the
+retention task can return freed space to the filesystem.
+
+Usage:
+    python migrate.py [db_path]
+
+Stop the backend before running this against its database.
+"""
+import argparse
+import os
+import sqlite3
+
+import settings
+from database import SCHEMA_VERSION, WeatherDatabase
+
+
+def migrate(db_path: str):
+    """
+    Upgrade, vacuum and analyze a database file.
+
+    :param db_path: Path to SQLite database file
+    """
+    with sqlite3.connect(db_path) as conn:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+    size_before = os.path.getsize(db_path)
+    print(f"{db_path}: schema version {version}, {size_before / 1024 / 1024:.1f} MB")
+
+    if version < SCHEMA_VERSION:
+        print(f"Upgrading to schema version {SCHEMA_VERSION}...")
+    WeatherDatabase(db_path, read_pool_size=0, stream_pool_size=0).close()
+
+    print("Compacting...")
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('VACUUM')
+        conn.execute('ANALYZE')
+    finally:
+        conn.close()
+
+    size_after = os.path.getsize(db_path)
+    print(f"Done: schema version {SCHEMA_VERSION}, {size_after / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate a weather database to the current schema.")
+    parser.add_argument("db_path", nargs="?", default=settings.DB_PATH,
+                        help=f"Path to the database (default {settings.DB_PATH})")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db_path):
+        parser.error(f"{args.db_path} does not exist")
+    migrate(args.db_path)
@@ -0,0 +1,245 @@
+"""
+Server-side activity recommendations.
+
+Applies the same if/else rules as the tray client (tray/recommendations.py)
+against named threshold profiles from profiles.json, so clients can fetch one
+small payload instead of downloading history and computing it themselves.
+
+State is maintained incrementally: every stored report is evaluated once per
+tracked profile, and the times it was good are kept in a sliding window, so
+the first good time is always at the front. Results are cached until the
+station's next report.
+"""
+import json
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import settings
+from report import WeatherReport
+
+ACTIVITIES = ('run', 'cycle', 'swim')
+
+
+def load_profiles(path: str = settings.RECOMMENDATION_PROFILES_PATH) -> Dict[str, Dict]:
+    """
+    Load threshold profiles.
+
+    :param path: Path to the profiles JSON file
+    :return: Dictionary of profile name to per-activity thresholds
+    """
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _value(weather: Dict, key: str, default):
+    """Read a weather value, falling back to the default when it is missing or None."""
+    value = weather.get(key)
+    return default if value is None else value
+
+
+def evaluate_activity(activity: str, weather: Dict, profile: Dict) -> Dict:
+    """
+    Evaluate if weather conditions are suitable for an activity.
+
+    Returns a dictionary with:
+    - status: "green" (good), "yellow" (moderate), or "red" (not recommended)
+    - reasons: List of condition descriptions
+    - score: 0-100 rating
+
+    :param activity: Activity name ("run", "cycle", or "swim")
+    :param weather: Weather data dictionary
+    :param profile: Per-activity thresholds
+    :return: Evaluation result dictionary
+    """
+    if not weather:
+        return {"status": "red", "reasons": ["No weather data available"], "score": 0}
+    if activity not in profile:
+        return {"status": "red", "reasons": ["Unknown activity"], "score": 0}
+
+    thresholds = profile[activity]
+    reasons = []
+    score = 100
+
+    # Extract weather values with safe defaults (stored rows hold None for missing values)
+    temp = float(_value(weather, 'temp_c', 999))
+    uv = float(_value(weather, 'uv', 11))
+    rain = float(_value(weather, 'rain_rate_mm', 0))
+    wind = float(_value(weather, 'wind_speed_kmh', 0))
+
+    # Temperature check
+    if temp < thresholds['temp_min_c']:
+        reasons.append(f"Too cold ({temp}°C)")
+        score = 0
+    elif temp > thresholds['temp_max_c']:
+        reasons.append(f"Too hot ({temp}°C)")
+        score = 0
+
+    # Rain check
+    if rain > thresholds['rain_rate_max_mm']:
+        reasons.append(f"Active rain ({rain}mm/hr)")
+        score = 0
+
+    # UV check (determines green/yellow/red)
+    if uv > thresholds['uv_moderate_max']:
+        reasons.append(f"UV too high ({uv})")
+        score = 0
+    elif uv > thresholds['uv_max']:
+        reasons.append(f"UV moderate ({uv})")
+        if score == 100:
+            score = 50
+
+    # Wind check (cycling only)
+    if 'wind_max_kmh' in thresholds and wind > thresholds['wind_max_kmh']:
+        reasons.append(f"Too windy ({wind} km/h)")
+        score = 0
+
+    if score == 0:
+        status = "red"
+    elif score < 100:
+        status = "yellow"
+    else:
+        status = "green"
+
+    if not reasons:
+        reasons = ["All conditions good"]
+
+    return {"status": status, "reasons": reasons, "score": score}
+
+
+def _is_good(activity: str, weather: Dict, profile: Dict) -> bool:
+    """Whether a report would be green for an activity, ignoring malformed reports."""
+    try:
+        return evaluate_activity(activity, weather, profile)['status'] == 'green'
+    except (TypeError, ValueError):
+        return False
+
+
+class _ProfileState:
+    """Incremental recommendation state for one (station, profile) pair."""
+
+    def __init__(self, profile: Dict):
+        self.profile = profile
+        self.latest: Dict = {}
+        # Times each activity was good, oldest first
+        self.good_times = {activity: deque() for activity in ACTIVITIES}
+        self.cached: Optional[Dict] = None
+        # When the recommendations were last asked for
+        self.last_read = datetime.now()
+
+    def observe(self, metric_data: Dict, received_at: datetime, window: timedelta):
+        """Fold one report into the state, drop good times that have left the window and invalidate the cached result."""
+        self.latest = metric_data
+        cutoff = received_at - window
+        for activity, times in self.good_times.items():
+            while times and times[0] <= cutoff:
+                times.popleft()
+            if _is_good(activity, metric_data, self.profile):
+                times.append(received_at)
+        self.cached = None
+
+    def result(self, window: timedelta) -> Dict:
+        """Build (or reuse) the recommendations for the latest report."""
+        self.last_read = datetime.now()
+        if self.cached is not None:
+            return self.cached
+
+        cutoff = datetime.now() - window
+        recommendations = {}
+        for activity, times in self.good_times.items():
+            while times and times[0] <= cutoff:
+                times.popleft()
+            evaluation = evaluate_activity(activity, self.latest, self.profile)
+            prediction = None
+            # Only show prediction if conditions aren't currently good
+            if evaluation['status'] != 'green' and times:
+                prediction = f"Yesterday at {times[0].strftime('%I:%M %p')} was good"
+            recommendations[activity] = {**evaluation, "prediction": prediction}
+
+        self.cached = recommendations
+        return recommendations
+
+
+class RecommendationEngine:
+    """Keeps recommendations for every requested (station, profile) pair up to date as reports arrive."""
+
+    def __init__(self, load_history: Callable[[int, Optional[str]], List[Dict]],
+                 profiles: Optional[Dict[str, Dict]] = None,
+                 window_hours: int = settings.RECOMMENDATION_WINDOW_HOURS,
+                 idle_hours: float = settings.RECOMMENDATION_IDLE_HOURS):
+        """
+        :param load_history: Function returning stored reports for (hours, station), used to seed new state
+        :param profiles: Threshold profiles by name (default: loaded from profiles.json)
+        :param window_hours: How far back to look for good times
+        :param idle_hours: Hours a (station, profile) pair is kept up to date without being requested
+        """
+        self.load_history = load_history
+        self.profiles = profiles if profiles is not None else load_profiles()
+        self.window = timedelta(hours=window_hours)
+        self.idle = timedelta(hours=idle_hours)
+        # States keyed by station, then profile name; station None follows every station
+        self._states: Dict[Optional[str], Dict[str, _ProfileState]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, station: Optional[str], report: WeatherReport):
+        """
+        Fold a new report into every tracked state it affects.
+
+        States that haven't been requested for the idle period are dropped
+        instead; the next request seeds them again from stored history.
+
+        :param station: Station PASSKEY the report came from
+        :param report: Parsed report; evaluated through its dict-style get()
+        """
+        received_at = datetime.now()
+        idle_since = received_at - self.idle
+        with self._lock:
+            groups = {station, None}
+            for group in groups:
+                states = self._states.get(group)
+                if not states:
+                    continue
+                for profile, state in list(states.items()):
+                    if state.last_read < idle_since:
+                        del states[profile]
+                    else:
+                        state.observe(report, received_at, self.window)
+                if not states:
+                    del self._states[group]
+
+    def get(self, station: Optional[str] = None, profile: str = "default",
+            latest: Optional[WeatherReport] = None) -> Dict:
+        """
+        Get recommendations for the latest report.
+
+        The first request for a (station, profile) pair seeds its state from stored
+        history; after that it is kept up to date by observe().
+
+        :param station: Station PASSKEY (default: all stations, i.e. whichever reported last)
+        :param profile: Threshold profile name
+        :param latest: Latest report held in memory, used when seeding new state
+        :return: Dictionary with recommendations for each activity
+        :raises KeyError: If the profile doesn't exist
+        """
+        thresholds = self.profiles[profile]
+        with self._lock:
+            state = self._states.get(station, {}).get(profile)
+            if state is not None:
+                return state.result(self.window)
+
+        # Seed outside the lock so observe() on the event loop never waits on the query
+        state = _ProfileState(thresholds)
+        hours = int(self.window.total_seconds() // 3600)
+        for record in self.load_history(hours, station):
+            try:
+                received_at = datetime.fromtimestamp(record['timestamp'])
+            except (KeyError, TypeError, ValueError, OverflowError, OSError):
+                continue
+            state.observe(record, received_at, self.window)
+        if latest:
+            state.latest = latest
+
+        with self._lock:
+            state = self._states.setdefault(station, {}).setdefault(profile, state)
+            return state.result(self.window)
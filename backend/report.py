@@ -0,0 +1,165 @@
+"""
+Ecowitt report parsing.
+
+The WS2910 console uploads a flat application/x-www-form-urlencoded body in
+imperial units. parse_report() splits it directly into a WeatherReport,
+converting each value the backend stores to metric units as it is read, so a
+report costs one pass over the body and one object with typed fields.
+
+The metric dictionary served by /data/latest and the live stream, and its
+JSON encoding, are built from the report only when something asks for them,
+and then kept.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from urllib.parse import unquote_plus
+
+
+def _to_int(value: str) -> int:
+    return int(float(value))
+
+
+# Form field -> (report attribute, conversion from the value as sent)
+_CONVERSIONS: Dict[str, Tuple[str, Callable[[str], object]]] = {
+    # Temperature: F → C
+    'tempf': ('temp_c', lambda value: round((float(value) - 32) / 1.8, 1)),
+    # Wind speed: mph → km/h
+    'windspeedmph': ('wind_speed_kmh', lambda value: round(float(value) * 1.609344, 1)),
+    # Rain rate: in/hr → mm/hr
+    'rainratein': ('rain_rate_mm', lambda value: round(float(value) * 25.4, 2)),
+    # Pressure: inHg → hPa
+    'baromrelin': ('pressure_hpa', lambda value: round(float(value) * 33.8639, 1)),
+    # No conversion needed
+    'humidity': ('humidity', _to_int),
+    'uv': ('uv', float),
+    'winddir': ('wind_dir', _to_int),
+    'solarradiation': ('solarradiation', float),
+    'interval': ('interval', _to_int),
+    'PASSKEY': ('station', str),
+    'dateutc': ('dateutc', str),
+}
+
+# Metric dictionary key -> report attribute, for values held as typed fields
+_TYPED_KEYS = {
+    'PASSKEY': 'station',
+    **{attribute: attribute for attribute, _ in _CONVERSIONS.values() if attribute != 'station'},
+    # Derived metrics, filled in on receipt (see derived.py)
+    **{attribute: attribute for attribute in ('dew_point_c', 'feels_like_c', 'temp_min_c', 'temp_max_c', 'rain_today_mm')},
+}
+
+
+@dataclass(slots=True)
+class WeatherReport:
+    """One station report, with the values the backend uses converted to metric units."""
+
+    station: Optional[str] = None
+    dateutc: Optional[str] = None
+    temp_c: Optional[float] = None
+    humidity: Optional[int] = None
+    uv: Optional[float] = None
+    wind_speed_kmh: Optional[float] = None
+    wind_dir: Optional[int] = None
+    rain_rate_mm: Optional[float] = None
+    solarradiation: Optional[float] = None
+    pressure_hpa: Optional[float] = None
+    interval: Optional[int] = None
+    # Derived on receipt: dew point, apparent temperature, and today's extremes and rainfall so far
+    dew_point_c: Optional[float] = None
+    feels_like_c: Optional[float] = None
+    temp_min_c: Optional[float] = None
+    temp_max_c: Optional[float] = None
+    rain_today_mm: Optional[float] = None
+    # Every form field as sent, in imperial units
+    fields: Dict[str, str] = field(default_factory=dict)
+    # Stamped on receipt: increases with every report accepted, and epoch seconds received
+    version: int = 0
+    received: float = 0.0
+    _dict: Optional[Dict] = field(default=None, repr=False, compare=False)
+    _json: Optional[str] = field(default=None, repr=False, compare=False)
+
+    def get(self, key: str, default=None):
+        """
+        Read a value by its metric dictionary key, like dict.get().
+
+        :param key: Key as in as_dict(), e.g. "temp_c" or "PASSKEY"
+        :param default: Returned when the report has no value for the key
+        :return: Typed value for converted fields, otherwise the value as sent
+        """
+        attribute = _TYPED_KEYS.get(key)
+        if attribute is not None:
+            value = getattr(self, attribute)
+            return default if value is None else value
+        return self.fields.get(key, default)
+
+    def as_dict(self) -> Dict:
+        """
+        Every field as sent plus the converted metric values, as served by /data/latest.
+
+        Built on first use and kept, so it must not be modified.
+
+        :return: Dictionary containing metric weather data
+        """
+        if self._dict is None:
+            metric_data = dict(self.fields)
+            for key, attribute in _TYPED_KEYS.items():
+                value = getattr(self, attribute)
+                if value is not None:
+                    metric_data[key] = value
+            self._dict = metric_data
+        return self._dict
+
+    def as_json(self) -> str:
+        """
+        as_dict() encoded as JSON, built on first use and kept.
+
+        :return: JSON object text
+        """
+        if self._json is None:
+            self._json = json.dumps(self.as_dict(), separators=(',', ':'))
+        return self._json
+
+
+def parse_fields(items: Iterable[Tuple[str, object]]) -> WeatherReport:
+    """
+    Build a report from decoded form fields.
+
+    Values that fail to convert are kept as sent but left out of the typed
+    fields, so one faulty sensor doesn't cost the rest of the report.
+
+    :param items: (name, value) pairs in imperial units
+    :return: Parsed report
+    """
+    report = WeatherReport()
+    fields = report.fields
+    for key, value in items:
+        fields[key] = value
+        conversion = _CONVERSIONS.get(key)
+        if conversion is not None and value != '':
+            attribute, convert = conversion
+            try:
+                setattr(report, attribute, convert(value))
+            except (TypeError, ValueError):
+                pass
+    return report
+
+
+def parse_report(body: bytes) -> WeatherReport:
+    """
+    Parse an application/x-www-form-urlencoded report body.
+
+    :param body: Request body as uploaded by the console
+    :return: Parsed report
+    """
+    return parse_fields(_split_form(body.decode('utf-8', errors='replace')))
+
+
+def _split_form(text: str) -> Iterable[Tuple[str, str]]:
+    """Split a url-encoded body into (name, value) pairs, unquoting only pairs that need it."""
+    for pair in text.split('&'):
+        key, _, value = pair.partition('=')
+        if not key:
+            continue
+        if '%' in pair or '+' in pair:
+            key, value = unquote_plus(key), unquote_plus(value)
+        yield key, value
@@ -0,0 +1,120 @@
+"""
+Background retention for stored weather data.
+
+Each table has its own retention period (raw reports are usually kept for much
+less time than hourly or daily rollups). A background task periodically drops
+expired monthly partitions of raw reports and deletes expired rollup rows in
+small batches, pausing between them so the ingest writer is never held up for
+long, then releases the freed pages and truncates the WAL.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+import logs
+import settings
+from database import WeatherDatabase
+
+logger = logs.get_logger("retention")
+
+
+def default_policy() -> Dict[str, int]:
+    """
+    Build the retention policy from settings.
+
+    :return: Dictionary of table name to days of data kept (0 keeps everything)
+    """
+    return {
+        'weather_reports': settings.RETENTION_RAW_DAYS,
+        'weather_rollup_5m': settings.RETENTION_ROLLUP_5M_DAYS,
+        'weather_rollup_1h': settings.RETENTION_ROLLUP_1H_DAYS,
+        'weather_rollup_1d': settings.RETENTION_ROLLUP_1D_DAYS,
+    }
+
+
+class RetentionScheduler:
+    """Periodically prunes expired rows and reclaims the space they used."""
+
+    def __init__(self, db: WeatherDatabase,
+                 policy: Optional[Dict[str, int]] = None,
+                 interval: float = settings.RETENTION_INTERVAL,
+                 batch_size: int = settings.RETENTION_BATCH_SIZE,
+                 batch_pause: float = settings.RETENTION_BATCH_PAUSE,
+                 vacuum_pages: int = settings.RETENTION_VACUUM_PAGES):
+        """
+        Initialize the scheduler. Call start() from a running event loop before use.
+
+        :param db: Database to prune
+        :param policy: Days kept per table, 0 to keep forever (default: from settings)
+        :param interval: Seconds between retention runs
+        :param batch_size: Maximum number of rows deleted per transaction
+        :param batch_pause: Seconds to wait between batches
+        :param vacuum_pages: Maximum number of free pages released per run
+        """
+        self.db = db
+        self.policy = policy if policy is not None else default_policy()
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages
+        self._stopping: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the background retention task. The first run happens immediately."""
+        self._stopping = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background task, letting any batch in progress finish."""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def run_once(self) -> Dict[str, int]:
+        """
+        Apply the retention policy to every table, then reclaim space.
+
+        :return: Dictionary of table name to rows deleted
+        """
+        deleted = {}
+        now = time.time()
+        for table, days in self.policy.items():
+            if days <= 0:
+                continue
+            cutoff = int(now - days * 86400)
+            if table == 'weather_reports':
+                deleted[table] = await asyncio.to_thread(self.db.drop_partitions, cutoff)
+                continue
+            deleted[table] = 0
+            while not self._stopping.is_set():
+                count = await asyncio.to_thread(self.db.delete_expired, table, cutoff, self.batch_size)
+                deleted[table] += count
+                if count < self.batch_size:
+                    break
+                await self._wait(self.batch_pause)
+
+        if any(deleted.values()):
+            await asyncio.to_thread(self.db.reclaim_space, self.vacuum_pages)
+        return deleted
+
+    async def _run(self):
+        """Run retention every interval until stopped."""
+        while not self._stopping.is_set():
+            try:
+                deleted = await self.run_once()
+                if any(deleted.values()):
+                    fields = {table: count for table, count in deleted.items() if count}
+                    logger.info("Retention removed expired rows", extra={"fields": fields})
+            except Exception as e:
+                logger.error("Retention run failed", extra={"fields": {"error": e}})
+            await self._wait(self.interval)
+
+    async def _wait(self, seconds: float):
+        """Sleep, returning early if the scheduler is stopped."""
+        try:
+            await asyncio.wait_for(self._stopping.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,102 @@
+"""
+Backend configuration.
+
+Every tunable for the backend lives here. Each value can be overridden with an
+environment variable of the same name prefixed with WEATHER_ (e.g. WEATHER_DB_PATH).
+"""
+import os
+
+
+def _env_str(name: str, default: str) -> str:
+    """
+    Read a string setting from the environment.
+
+    :param name: Setting name without the WEATHER_ prefix
+    :param default: Value used when the variable is not set
+    :return: Setting value
+    """
+    return os.environ.get(f"WEATHER_{name}", default)
+
+
+def _env_int(name: str, default: int) -> int:
+    """
+    Read an integer setting from the environment.
+
+    :param name: Setting name without the WEATHER_ prefix
+    :param default: Value used when the variable is not set
+    :return: Setting value
+    """
+    return int(os.environ.get(f"WEATHER_{name}", default))
+
+
+def _env_float(name: str, default: float) -> float:
+    """
+    Read a float setting from the environment.
+
+    :param name: Setting name without the WEATHER_ prefix
+    :param default: Value used when the variable is not set
+    :return: Setting value
+    """
+    return float(os.environ.get(f"WEATHER_{name}", default))
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    """
+    Read a boolean setting from the environment ("1", "true", "yes" or "on" enable it).
+
+    :param name: Setting name without the WEATHER_ prefix
+    :param default: Value used when the variable is not set
+    :return: Setting value
+    """
+    value = os.environ.get(f"WEATHER_{name}")
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Database
+DB_PATH = _env_str("DB_PATH", "weather_history.db")
+
+# Ingestion queue
+INGEST_QUEUE_SIZE = _env_int("INGEST_QUEUE_SIZE", 10000)    # Max reports buffered in memory
+INGEST_BATCH_SIZE = _env_int("INGEST_BATCH_SIZE", 500)      # Max reports per transaction
+INGEST_FLUSH_INTERVAL = _env_float("INGEST_FLUSH_INTERVAL", 1.0)  # Seconds before a partial batch is written
+
+# SQLite connection tuning (applied to every connection)
+DB_READ_POOL_SIZE = _env_int("DB_READ_POOL_SIZE", 4)            # Pooled read connections
+DB_STREAM_POOL_SIZE = _env_int("DB_STREAM_POOL_SIZE", 4)        # Read connections reserved for streamed history
+DB_READ_TIMEOUT = _env_float("DB_READ_TIMEOUT", 5.0)            # Seconds to wait for a free read connection
+DB_JOURNAL_MODE = _env_str("DB_JOURNAL_MODE", "WAL")            # WAL lets reads run alongside writes
+DB_SYNCHRONOUS = _env_str("DB_SYNCHRONOUS", "NORMAL")           # NORMAL is durable enough under WAL
+DB_MMAP_SIZE = _env_int("DB_MMAP_SIZE", 256 * 1024 * 1024)      # Bytes of the file to memory-map
+DB_CACHE_SIZE = _env_int("DB_CACHE_SIZE", -16000)               # Page cache; negative values are KiB
+DB_STATEMENT_CACHE_SIZE = _env_int("DB_STATEMENT_CACHE_SIZE", 128)  # Prepared statements kept per connection
+DB_BUSY_TIMEOUT = _env_float("DB_BUSY_TIMEOUT", 5.0)            # Seconds to wait on a locked database
+HISTORY_CHUNK_SIZE = _env_int("HISTORY_CHUNK_SIZE", 1000)       # Rows fetched (and streamed) at a time
+
+# Live report stream (/data/stream)
+STREAM_QUEUE_SIZE = _env_int("STREAM_QUEUE_SIZE", 16)           # Events buffered per subscriber
+STREAM_KEEPALIVE = _env_float("STREAM_KEEPALIVE", 15.0)         # Seconds between keepalive comments
+
+# Server-side recommendations (/data/recommendations)
+RECOMMENDATION_PROFILES_PATH = _env_str(                         # Threshold profiles
+    "RECOMMENDATION_PROFILES_PATH", os.path.join(os.path.dirname(__file__), "profiles.json"))
+RECOMMENDATION_WINDOW_HOURS = _env_int("RECOMMENDATION_WINDOW_HOURS", 24)  # History searched for good times
+RECOMMENDATION_IDLE_HOURS = _env_float("RECOMMENDATION_IDLE_HOURS", 24.0)  # Unrequested state kept this long
+
+# Retention (rows older than the given number of days are deleted; 0 keeps them forever)
+RETENTION_RAW_DAYS = _env_int("RETENTION_RAW_DAYS", 30)             # Raw reports
+RETENTION_ROLLUP_5M_DAYS = _env_int("RETENTION_ROLLUP_5M_DAYS", 180)  # 5 minute rollups
+RETENTION_ROLLUP_1H_DAYS = _env_int("RETENTION_ROLLUP_1H_DAYS", 730)  # Hourly rollups
+RETENTION_ROLLUP_1D_DAYS = _env_int("RETENTION_ROLLUP_1D_DAYS", 0)    # Daily rollups
+RETENTION_INTERVAL = _env_float("RETENTION_INTERVAL", 3600.0)       # Seconds between retention runs
+RETENTION_BATCH_SIZE = _env_int("RETENTION_BATCH_SIZE", 1000)       # Max rows deleted per transaction
+RETENTION_BATCH_PAUSE = _env_float("RETENTION_BATCH_PAUSE", 0.05)   # Seconds between batches, leaving room for writes
+RETENTION_VACUUM_PAGES = _env_int("RETENTION_VACUUM_PAGES", 4096)   # Max free pages released per run
+
+# Logging (written from a background thread; see logs.py)
+LOG_LEVEL = _env_str("LOG_LEVEL", "INFO")                         # Minimum level logged
+LOG_FORMAT = _env_str("LOG_FORMAT", "text")                       # "text" (key=value) or "json"
+LOG_QUEUE_SIZE = _env_int("LOG_QUEUE_SIZE", 10000)                # Records buffered before new ones are dropped
+LOG_REPORT_SAMPLE_SECONDS = _env_float("LOG_REPORT_SAMPLE_SECONDS", 300.0)  # Min seconds between report logs per station
+LOG_FULL_REPORTS = _env_bool("LOG_FULL_REPORTS", False)           # Log every report with all of its fields
@@ -0,0 +1,99 @@
+"""
+Server-Sent Events fan-out for live weather reports.
+
+Each new report is encoded once and handed to every subscriber's queue, so
+the per-subscriber cost of a report is a single queue put. Subscribers that
+fall behind lose their oldest undelivered events rather than slowing ingestion.
+"""
+import asyncio
+from typing import Dict, Optional, Set
+
+import settings
+from report import WeatherReport
+
+
+def encode_event(report: WeatherReport) -> bytes:
+    """
+    Encode a report as an SSE "report" event.
+
+    :param report: Parsed report
+    :return: Encoded event, ready to write to the stream
+    """
+    return f"event: report\ndata: {report.as_json()}\n\n".encode()
+
+
+class ReportBroadcaster:
+    """Fans out each new report to the stream subscribers interested in its station."""
+
+    def __init__(self, queue_size: int = settings.STREAM_QUEUE_SIZE):
+        """
+        :param queue_size: Events buffered per subscriber before the oldest are dropped
+        """
+        self.queue_size = queue_size
+        # Subscribers keyed by the station they follow; None follows every station
+        self._subscribers: Dict[Optional[str], Set[asyncio.Queue]] = {}
+        self.closed = False
+
+    def subscriber_count(self) -> int:
+        """
+        Number of connected stream subscribers.
+
+        :return: Subscriber count across all stations
+        """
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    def subscribe(self, station: Optional[str] = None) -> asyncio.Queue:
+        """
+        Register a new subscriber.
+
+        :param station: Station PASSKEY to follow, or None for every station
+        :return: Queue that receives encoded events; None marks the end of the stream
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.closed:
+            # Shutting down: the stream ends straight after the current report
+            queue.put_nowait(None)
+            return queue
+        self._subscribers.setdefault(station, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue, station: Optional[str] = None):
+        """
+        Remove a subscriber.
+
+        :param queue: Queue returned by subscribe()
+        :param station: Station the subscriber followed
+        """
+        queues = self._subscribers.get(station)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[station]
+
+    def publish(self, station: Optional[str], report: WeatherReport):
+        """
+        Send a report to every subscriber following its station or all stations.
+
+        :param station: Station PASSKEY the report came from
+        :param report: Parsed report
+        """
+        targets = [*self._subscribers.get(station, ()), *self._subscribers.get(None, ())]
+        if not targets:
+            return
+        event = encode_event(report)
+        for queue in targets:
+            self._offer(queue, event)
+
+    def close(self):
+        """End every open stream, and any opened later, e.g. on shutdown."""
+        self.closed = True
+        for queues in self._subscribers.values():
+            for queue in queues:
+                self._offer(queue, None)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, event: Optional[bytes]):
+        """Put an event on a subscriber queue, dropping its oldest event if full."""
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
@@ -0,0 +1,316 @@
+"""
+Ingestion and query benchmark for the weather backend.
+
+Starts the backend on a scratch database (or targets one that is already
+running), then drives it with simulated WS2910 stations posting reports and
+tray-like readers polling /data/latest and /data/history. Reports ingest
+throughput, p50/p99 latency per endpoint and database growth.
+
+Usage:
+    python benchmark.py [--stations 10] [--interval 1] [--duration 30] [--readers 2]
+
+Run with --help for every option. Only the standard library is needed on top of
+the backend's own requirements.
+"""
+import argparse
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from simulator import StationSimulator
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+# Metrics the tray keeps in its history window, so readers ask for the same projection
+HISTORY_FIELDS = 'temp_c,uv,rain_rate_mm,wind_speed_kmh'
+
+
+class LatencyLog:
+    """Collects request latencies per endpoint from many threads."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, seconds: float, ok: bool = True):
+        """
+        Record one request.
+
+        :param endpoint: Endpoint label
+        :param seconds: Time from sending the request to reading the whole response
+        :param ok: Whether the request succeeded
+        """
+        with self._lock:
+            if ok:
+                self.samples.setdefault(endpoint, []).append(seconds)
+            else:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def summary(self) -> List[Tuple[str, int, float, float, int]]:
+        """
+        Summarise every endpoint.
+
+        :return: List of (endpoint, successful requests, p50 ms, p99 ms, errors)
+        """
+        rows = []
+        for endpoint in sorted(set(self.samples) | set(self.errors)):
+            samples = sorted(self.samples.get(endpoint, []))
+            rows.append((
+                endpoint,
+                len(samples),
+                _percentile(samples, 50) * 1000,
+                _percentile(samples, 99) * 1000,
+                self.errors.get(endpoint, 0),
+            ))
+        return rows
+
+
+def _percentile(samples: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted samples (0 when there are none)."""
+    if not samples:
+        return 0.0
+    rank = max(1, -(-len(samples) * percent // 100))
+    return samples[int(rank) - 1]
+
+
+class Client:
+    """Keep-alive HTTP connection to the backend, reconnecting after errors."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.conn: Optional[http.client.HTTPConnection] = None
+
+    def request(self, method: str, path: str, body: Optional[str] = None,
+                headers: Optional[Dict[str, str]] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send a request and read the whole response.
+
+        :return: Tuple of (status, headers with lower-case names, body)
+        """
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+            headers = {key.lower(): value for key, value in response.getheaders()}
+            return response.status, headers, response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = None
+            raise
+
+
+def run_station(client: Client, simulator: StationSimulator, interval: float,
+                stop: threading.Event, log: LatencyLog, sent: List[int]):
+    """
+    Post reports for one station until stopped.
+
+    :param interval: Seconds between reports (0 sends as fast as the backend accepts them)
+    :param sent: Single-item list the number of accepted reports is added to
+    """
+    headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+    next_send = time.perf_counter()
+    while not stop.is_set():
+        body = urlencode(simulator.report())
+        started = time.perf_counter()
+        try:
+            status, _, _ = client.request('POST', '/data/report', body, headers)
+            ok = status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+        log.record('POST /data/report', time.perf_counter() - started, ok)
+        if ok:
+            sent[0] += 1
+
+        next_send += interval
+        delay = next_send - time.perf_counter()
+        if delay > 0:
+            stop.wait(delay)
+        else:
+            next_send = time.perf_counter()
+
+
+def run_reader(client: Client, hours: int, interval: float, stop: threading.Event, log: LatencyLog):
+    """
+    Poll the backend like a tray client until stopped: latest report, then a history delta,
+    with a full history window fetched every tenth round.
+    """
+    cursor = None
+    rounds = 0
+    while not stop.is_set():
+        polls = [('GET /data/latest', '/data/latest')]
+        full = cursor is None or rounds % 10 == 0
+        params = {'hours': hours, 'fields': HISTORY_FIELDS}
+        if not full:
+            params['since_id'] = cursor
+        label = 'GET /data/history' if full else 'GET /data/history (delta)'
+        polls.append((label, '/data/history?' + urlencode(params)))
+
+        for label, path in polls:
+            started = time.perf_counter()
+            try:
+                status, headers, _ = client.request('GET', path)
+                ok = status == 200
+            except (OSError, http.client.HTTPException):
+                ok, headers = False, {}
+            log.record(label, time.perf_counter() - started, ok)
+            if ok and 'x-next-cursor' in headers:
+                cursor = int(headers['x-next-cursor'])
+        rounds += 1
+        stop.wait(interval)
+
+
+def stored_reports(client: Client) -> Optional[int]:
+    """Newest report id the backend has stored, read from the history cursor."""
+    try:
+        status, headers, _ = client.request('GET', '/data/history?hours=0&fields=id')
+    except (OSError, http.client.HTTPException):
+        return None
+    if status != 200 or 'x-next-cursor' not in headers:
+        return None
+    return int(headers['x-next-cursor'])
+
+
+def database_size(db_path: str) -> int:
+    """Size of the database file plus its write-ahead log, in bytes."""
+    return sum(os.path.getsize(path) for path in (db_path, db_path + '-wal') if os.path.exists(path))
+
+
+def start_backend(db_path: str, port: int) -> subprocess.Popen:
+    """
+    Start the backend with uvicorn on a given database and wait until it answers /health.
+
+    :return: The server process
+    """
+    env = {**os.environ, 'WEATHER_DB_PATH': os.path.abspath(db_path)}
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port),
+         '--log-level', 'warning'],
+        cwd=BACKEND_DIR, env=env
+    )
+    client = Client('127.0.0.1', port)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with status {process.returncode}")
+        try:
+            if client.request('GET', '/health')[0] == 200:
+                return process
+        except (OSError, http.client.HTTPException):
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not start within 30 seconds")
+
+
+def stop_backend(process: subprocess.Popen):
+    """Stop the backend gracefully, so queued reports are flushed and the WAL is checkpointed."""
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the weather backend with simulated stations.")
+    parser.add_argument('--stations', type=int, default=10, help="Simulated stations (default 10)")
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help="Seconds between reports per station, 0 for as fast as possible (default 1)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to run (default 30)")
+    parser.add_argument('--readers', type=int, default=2, help="Concurrent tray-like readers (default 2)")
+    parser.add_argument('--read-interval', type=float, default=0.5,
+                        help="Seconds between reader polls (default 0.5)")
+    parser.add_argument('--history-hours', type=int, default=24, help="History window readers fetch (default 24)")
+    parser.add_argument('--url', help="Benchmark a backend that is already running instead of starting one")
+    parser.add_argument('--db', help="Database for the started backend (default: a new scratch file); "
+                                     "with --url, the running backend's database, to report its growth")
+    parser.add_argument('--port', type=int, default=8765, help="Port for the started backend (default 8765)")
+    args = parser.parse_args()
+
+    scratch = None
+    process = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname, target.port or 80
+        db_path = args.db
+    else:
+        host, port = '127.0.0.1', args.port
+        if args.db:
+            db_path = args.db
+        else:
+            scratch = tempfile.TemporaryDirectory()
+            db_path = os.path.join(scratch.name, 'bench.db')
+        process = start_backend(db_path, port)
+
+    try:
+        size_before = database_size(db_path) if db_path else None
+        stored_before = stored_reports(Client(host, port)) or 0
+
+        log = LatencyLog()
+        stop = threading.Event()
+        counters = [[0] for _ in range(args.stations)]
+        threads = [
+            threading.Thread(target=run_station, daemon=True, args=(
+                Client(host, port), StationSimulator(f"BENCH{i:011d}", interval=max(1, round(args.interval))),
+                args.interval, stop, log, counters[i]))
+            for i in range(args.stations)
+        ] + [
+            threading.Thread(target=run_reader, daemon=True, args=(
+                Client(host, port), args.history_hours, args.read_interval, stop, log))
+            for _ in range(args.readers)
+        ]
+
+        print(f"Running {args.stations} stations every {args.interval}s and {args.readers} readers "
+              f"for {args.duration}s against {host}:{port}...")
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        sent = sum(counter[0] for counter in counters)
+
+        # Give the write-behind queue time to drain before counting what was stored
+        client = Client(host, port)
+        stored = stored_reports(client)
+        deadline = time.time() + 30
+        while stored is not None and stored - stored_before < sent and time.time() < deadline:
+            time.sleep(0.5)
+            stored = stored_reports(client)
+    finally:
+        if process is not None:
+            stop_backend(process)
+
+    print()
+    print(f"Ingest: {sent} reports accepted in {elapsed:.1f}s ({sent / elapsed:.1f} reports/s), "
+          f"{(stored or 0) - stored_before} stored")
+    print()
+    print(f"{'Endpoint':<30} {'Requests':>9} {'p50 ms':>9} {'p99 ms':>9} {'Errors':>7}")
+    for endpoint, count, p50, p99, errors in log.summary():
+        print(f"{endpoint:<30} {count:>9} {p50:>9.2f} {p99:>9.2f} {errors:>7}")
+
+    if db_path:
+        size_after = database_size(db_path)
+        growth = size_after - size_before
+        per_report = f", {growth / sent:.0f} bytes/report" if sent else ""
+        print()
+        print(f"Database: {size_before / 1024 / 1024:.2f} MB -> {size_after / 1024 / 1024:.2f} MB "
+              f"(+{growth / 1024 / 1024:.2f} MB{per_report})")
+
+    if scratch is not None:
+        scratch.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Synthetic Ecowitt WS2910 weather station.
+
+Produces the same form fields a WS2910 console uploads with the custom server
+("Ecowitt" protocol) setting, in imperial units. Values follow a daily cycle
+with random drift, so consecutive reports from one station look like a real
+day of weather rather than noise.
+"""
+import math
+import random
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+
+class StationSimulator:
+    """Generates a stream of realistic reports for one station."""
+
+    def __init__(self, passkey: str, interval: int = 60, seed: Optional[int] = None):
+        """
+        :param passkey: Station PASSKEY sent with every report
+        :param interval: Reporting interval in seconds, sent as the interval field
+        :param seed: Seed for the station's random weather (default: derived from the passkey)
+        """
+        self.passkey = passkey
+        self.interval = interval
+        self.random = random.Random(seed if seed is not None else passkey)
+        self.runtime = self.random.randint(0, 86400)
+        # Per-station climate, so stations don't all report the same weather
+        self.base_temp_f = self.random.uniform(50, 80)
+        self.base_pressure_inhg = self.random.uniform(29.8, 30.2)
+        self.temp_drift = 0.0
+        self.wind_mph = self.random.uniform(0, 10)
+        self.wind_dir = self.random.uniform(0, 360)
+        self.max_daily_gust = 0.0
+        self.raining = False
+        self.event_rain_in = 0.0
+        self.daily_rain_in = 0.0
+        self.total_rain_in = self.random.uniform(0, 100)
+
+    def report(self, now: Optional[datetime] = None) -> Dict[str, str]:
+        """
+        Build the next report.
+
+        :param now: Time of the report (default: now, UTC)
+        :return: Dictionary of form field name to value, as the console sends them
+        """
+        now = now or datetime.now(timezone.utc)
+        rng = self.random
+        self.runtime += self.interval
+
+        # Daily cycle: coldest around dawn, sun peaking at midday
+        hour = now.hour + now.minute / 60
+        daylight = max(0.0, math.sin((hour - 6) / 12 * math.pi))
+        self.temp_drift = max(-8.0, min(8.0, self.temp_drift + rng.gauss(0, 0.2)))
+        temp_f = self.base_temp_f + 10 * math.sin((hour - 9) / 24 * 2 * math.pi) + self.temp_drift
+
+        # Occasional rain events, which cool things down and block the sun
+        if rng.random() < (0.05 if self.raining else 0.002):
+            self.raining = not self.raining
+            if self.raining:
+                self.event_rain_in = 0.0
+        rain_rate = rng.uniform(0.01, 0.6) if self.raining else 0.0
+        rain_in = rain_rate * self.interval / 3600
+        self.event_rain_in += rain_in
+        self.daily_rain_in += rain_in
+        self.total_rain_in += rain_in
+        cloud = 0.2 if self.raining else rng.uniform(0.7, 1.0)
+        solar = 1000 * daylight * cloud
+        if self.raining:
+            temp_f -= 5
+
+        self.wind_mph = max(0.0, self.wind_mph + rng.gauss(0, 1))
+        self.wind_dir = (self.wind_dir + rng.gauss(0, 15)) % 360
+        gust = self.wind_mph * rng.uniform(1.1, 1.8)
+        self.max_daily_gust = max(self.max_daily_gust, gust)
+        humidity = max(10, min(100, 95 - (temp_f - 40) + (25 if self.raining else 0)))
+        pressure = self.base_pressure_inhg + rng.gauss(0, 0.01)
+
+        return {
+            'PASSKEY': self.passkey,
+            'stationtype': 'EasyWeatherPro_V5.1.6',
+            'runtime': str(self.runtime),
+            'heap': str(rng.randint(20000, 30000)),
+            'dateutc': now.strftime('%Y-%m-%d %H:%M:%S'),
+            'tempinf': f"{rng.uniform(66, 74):.1f}",
+            'humidityin': str(rng.randint(35, 55)),
+            'baromrelin': f"{pressure:.3f}",
+            'baromabsin': f"{pressure - 0.3:.3f}",
+            'tempf': f"{temp_f:.1f}",
+            'humidity': str(int(humidity)),
+            'winddir': str(int(self.wind_dir)),
+            'windspeedmph': f"{self.wind_mph:.2f}",
+            'windgustmph': f"{gust:.2f}",
+            'maxdailygust': f"{self.max_daily_gust:.2f}",
+            'solarradiation': f"{solar:.2f}",
+            'uv': str(int(solar / 100)),
+            'rainratein': f"{rain_rate:.3f}",
+            'eventrainin': f"{self.event_rain_in:.3f}",
+            'hourlyrainin': f"{rain_rate:.3f}",
+            'dailyrainin': f"{self.daily_rain_in:.3f}",
+            'weeklyrainin': f"{self.daily_rain_in:.3f}",
+            'monthlyrainin': f"{self.daily_rain_in:.3f}",
+            'yearlyrainin': f"{self.total_rain_in:.3f}",
+            'totalrainin': f"{self.total_rain_in:.3f}",
+            'wh65batt': '0',
+            'freq': '433M',
+            'model': 'WS2900_V2.01.18',
+            'interval': str(self.interval),
+        }
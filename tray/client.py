@@ -0,0 +1,106 @@
+"""
+HTTP client for the weather backend.
+
+One requests.Session is shared by every request, so connections to the
+backend are kept alive and reused instead of opened per fetch. Requests that
+fail to connect, time out or get a 5xx answer are retried after a short
+jittered backoff. A small thread pool lets independent fetches (latest
+report, history, recommendations) run at the same time.
+"""
+import random
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept open to the backend: the live stream plus concurrent fetches
+POOL_SIZE = 4
+
+# Fetches run at the same time during a refresh
+WORKERS = 3
+
+# Retries per request, and the delay before the first one (doubled for each further retry)
+RETRIES = 2
+RETRY_DELAY = 0.5
+
+
+class BackendClient:
+    """Pooled, retrying access to the backend's REST API."""
+
+    def __init__(self, base_url: str, timeout: float = 5, retries: int = RETRIES):
+        """
+        :param base_url: Backend address, e.g. "http://192.168.1.10:8000"
+        :param timeout: Seconds to wait for each request
+        :param retries: Times a failed request is retried
+        """
+        self.base_url = base_url
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="fetch")
+
+    def get(self, path: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+            retries: Optional[int] = None) -> requests.Response:
+        """
+        Send a GET request over a pooled connection, retrying transient failures.
+
+        :param path: Endpoint path, e.g. "/data/latest"
+        :param params: Query parameters
+        :param headers: Request headers
+        :param retries: Times to retry (default: the client's setting)
+        :return: The response; 4xx responses are returned, not retried
+        :raises requests.exceptions.RequestException: If the last attempt fails
+        """
+        retries = self.retries if retries is None else retries
+        for attempt in range(retries + 1):
+            try:
+                response = self.session.get(self.base_url + path, params=params, headers=headers,
+                                            timeout=self.timeout)
+                if response.status_code < 500 or attempt == retries:
+                    return response
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == retries:
+                    raise
+            time.sleep(backoff(attempt, RETRY_DELAY))
+
+    def stream(self, path: str, params: Optional[Dict] = None, read_timeout: float = 60) -> requests.Response:
+        """
+        Open a streaming GET request, e.g. for /data/stream. Not retried.
+
+        :param path: Endpoint path
+        :param params: Query parameters
+        :param read_timeout: Seconds without data before the stream is treated as dropped
+        :return: Streaming response, to be used as a context manager
+        """
+        return self.session.get(self.base_url + path, params=params, stream=True,
+                                timeout=(self.timeout, read_timeout))
+
+    def submit(self, function: Callable, *args) -> Future:
+        """
+        Run a fetch on the client's thread pool.
+
+        :param function: Function to call
+        :param args: Arguments for it
+        :return: Future for its result
+        """
+        return self._executor.submit(function, *args)
+
+
+def backoff(attempt: int, base: float, limit: Optional[float] = None) -> float:
+    """
+    Jittered exponential backoff delay.
+
+    :param attempt: Number of failures before this one (0 for the first)
+    :param base: Delay after the first failure
+    :param limit: Largest delay returned
+    :return: Seconds to wait, between half and all of base * 2 ** attempt
+    """
+    delay = base * 2 ** attempt
+    if limit is not None:
+        delay = min(delay, limit)
+    return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,49 @@
+"""
+Decoder for the backend's columnar history encoding.
+
+See backend/columnar.py for the layout. Each column is returned as a
+memoryview over the response body, so loading a large history pull does not
+copy or build per-row objects.
+"""
+import struct
+import sys
+from array import array
+from typing import Dict
+
+MEDIA_TYPE = "application/vnd.weather.columnar"
+MAGIC = b"WXC1"
+
+
+def decode(payload: bytes) -> Dict[str, memoryview]:
+    """
+    Decode a columnar payload into one typed view per column.
+
+    :param payload: Response body
+    :return: Dictionary mapping column name to a memoryview of int64 ("q") or float64 ("d") values
+    """
+    if payload[:4] != MAGIC:
+        raise ValueError("Not a columnar history payload")
+
+    rows, column_count = struct.unpack_from('<IH', payload, 4)
+    offset = 10
+    directory = []
+    for _ in range(column_count):
+        name_length = payload[offset]
+        name = payload[offset + 1:offset + 1 + name_length].decode()
+        typecode = chr(payload[offset + 1 + name_length])
+        directory.append((name, typecode))
+        offset += name_length + 2
+    offset += -offset % 8
+
+    view = memoryview(payload)
+    columns = {}
+    for name, typecode in directory:
+        column = view[offset:offset + rows * 8].cast(typecode)
+        if sys.byteorder == 'big':
+            # Only big-endian hosts pay for a copy
+            column = array(typecode, column)
+            column.byteswap()
+            column = memoryview(column)
+        columns[name] = column
+        offset += rows * 8
+    return columns
@@ -0,0 +1,265 @@
+"""
+Rolling in-memory window of historical weather data.
+
+Kept in sync with the backend by delta fetches: only reports newer than the
+last seen cursor are downloaded, appended, and anything older than the window
+is evicted.
+
+Data is held column-wise, one packed array per metric plus an epoch-seconds
+timestamp array, so columnar responses are appended without building
+per-row objects.
+
+A HistoryStore keeps a copy of the window in a local SQLite file. The window
+loads from it at startup, so only the tail stored since the tray last ran is
+fetched, and predictions keep working while the backend is unreachable.
+"""
+import math
+import os
+import sqlite3
+import time
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Metrics kept in the window (the ones the recommendation logic reads)
+HISTORY_FIELDS = ('temp_c', 'uv', 'rain_rate_mm', 'wind_speed_kmh')
+
+
+def _epoch_seconds(timestamp) -> Optional[int]:
+    """Convert a record timestamp (epoch seconds or ISO string) to epoch seconds."""
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    try:
+        return int(datetime.fromisoformat(timestamp).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def _float_or_nan(value) -> float:
+    """Convert a record value to float, using NaN for missing or malformed values."""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class HistoryStore:
+    """Local SQLite copy of a history window, so it survives restarts and backend outages."""
+
+    def __init__(self, path: str, source: str):
+        """
+        :param path: SQLite file to keep the history in
+        :param source: Identifies where the history comes from (backend and station);
+                       history cached from a different source is discarded
+        :raises sqlite3.Error: If the file can't be opened or isn't a usable database
+        """
+        self.path = path
+        # Written from the tray's fetch threads, one fetch at a time
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            self._conn.execute('PRAGMA journal_mode = WAL')
+            self._conn.execute('PRAGMA synchronous = NORMAL')
+            columns = ', '.join(f'{field} REAL' for field in HISTORY_FIELDS)
+            with self._conn:
+                self._conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)')
+                # Cached data is only reused for the same source and the same set of fields
+                layout = f"{source}|{','.join(HISTORY_FIELDS)}"
+                if self._get('layout') != layout:
+                    self._conn.execute('DROP TABLE IF EXISTS history')
+                    self._conn.execute('DELETE FROM meta')
+                    self._set('layout', layout)
+                self._conn.execute(f'CREATE TABLE IF NOT EXISTS history (timestamp INTEGER NOT NULL, {columns})')
+                self._conn.execute('CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp)')
+        except sqlite3.Error:
+            # Release the file, so a corrupt one can be replaced (see open_store())
+            self._conn.close()
+            raise
+        self._insert_sql = (f"INSERT INTO history (timestamp, {', '.join(HISTORY_FIELDS)}) "
+                            f"VALUES ({', '.join('?' * (len(HISTORY_FIELDS) + 1))})")
+
+    def _get(self, key: str):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value):
+        self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    def load(self, cutoff: float) -> Tuple[Optional[int], List[Tuple]]:
+        """
+        Read the cached history newer than a cutoff.
+
+        :param cutoff: Epoch seconds; older records are skipped
+        :return: Tuple of (cursor the records were fetched up to, rows of timestamp then each field)
+        """
+        rows = self._conn.execute(
+            f"SELECT timestamp, {', '.join(HISTORY_FIELDS)} FROM history WHERE timestamp > ? ORDER BY rowid",
+            (int(cutoff),)
+        ).fetchall()
+        return self._get('cursor'), rows
+
+    def save(self, timestamps: Sequence[int], columns: Dict[str, Sequence[float]],
+             cursor: Optional[int], reset: bool, cutoff: float):
+        """
+        Append newly fetched records and drop expired ones, in one transaction.
+
+        :param timestamps: Timestamps of the new records
+        :param columns: Values of the new records, per field
+        :param cursor: Cursor the window is now at
+        :param reset: Whether the window was emptied first (see HistoryWindow._check_cursor())
+        :param cutoff: Epoch seconds; older records are deleted
+        """
+        # NaN binds as NULL, and loads back as NaN
+        rows = zip(timestamps, *(columns[field] for field in HISTORY_FIELDS))
+        with self._conn:
+            if reset:
+                self._conn.execute('DELETE FROM history')
+            self._conn.executemany(self._insert_sql, rows)
+            self._conn.execute('DELETE FROM history WHERE timestamp <= ?', (int(cutoff),))
+            self._set('cursor', cursor)
+
+    def close(self):
+        """Close the database file."""
+        self._conn.close()
+
+
+def open_store(path: str, source: str) -> Optional[HistoryStore]:
+    """
+    Open the local history copy, starting a new one if the file can't be used.
+
+    A corrupt file is deleted and recreated. If that fails too, e.g. because the
+    cache directory isn't writable, the tray runs with a memory-only window.
+
+    :param path: SQLite file to keep the history in
+    :param source: Identifies where the history comes from (see HistoryStore)
+    :return: The store, or None if no usable file could be opened
+    """
+    try:
+        return HistoryStore(path, source)
+    except sqlite3.Error as e:
+        print(f"Could not open history cache, starting a new one: {e}")
+    try:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        return HistoryStore(path, source)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Could not create history cache, keeping history in memory only: {e}")
+        return None
+
+
+class HistoryWindow:
+    """The last N hours of weather records, updated incrementally."""
+
+    def __init__(self, hours: int = 24, store: Optional[HistoryStore] = None):
+        """
+        :param hours: Size of the window in hours
+        :param store: Local copy to load from now and keep up to date (default: memory only)
+        """
+        self.hours = hours
+        self.cursor: Optional[int] = None
+        # ETag of the last fetch, sent back so an unchanged backend answers 304
+        self.etag: Optional[str] = None
+        self.timestamps = array('q')
+        self.columns = {field: array('d') for field in HISTORY_FIELDS}
+        self.store = store
+        if store is not None:
+            self._load()
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def apply(self, records: List[Dict], cursor: Optional[int]):
+        """
+        Merge a JSON fetch result into the window.
+
+        :param records: Records returned by the backend, oldest first
+        :param cursor: Next cursor returned by the backend
+        """
+        reset = self._check_cursor(cursor)
+        start = len(self.timestamps)
+        for record in records:
+            timestamp = _epoch_seconds(record.get('timestamp'))
+            if timestamp is None:
+                continue
+            self.timestamps.append(timestamp)
+            for field, column in self.columns.items():
+                column.append(_float_or_nan(record.get(field)))
+        self._save(start, cursor, reset)
+        self.cursor = cursor
+        self.evict()
+
+    def apply_columns(self, columns: Dict[str, memoryview], cursor: Optional[int]):
+        """
+        Merge a columnar fetch result into the window.
+
+        :param columns: Decoded columns returned by the backend
+        :param cursor: Next cursor returned by the backend
+        """
+        reset = self._check_cursor(cursor)
+        start = len(self.timestamps)
+        timestamps = columns.get('timestamp')
+        if timestamps is not None and len(timestamps):
+            # frombytes() wants a byte-format buffer; cast('B') re-views the same memory
+            self.timestamps.frombytes(timestamps.cast('B'))
+            for field, column in self.columns.items():
+                if field in columns:
+                    column.frombytes(columns[field].cast('B'))
+                else:
+                    column.extend([math.nan] * len(timestamps))
+        self._save(start, cursor, reset)
+        self.cursor = cursor
+        self.evict()
+
+    def _check_cursor(self, cursor: Optional[int]) -> bool:
+        """
+        Drop everything held when the cursor moves backwards.
+
+        That means the backend's database was replaced and the incoming data is a full window.
+
+        :return: True if the window was emptied
+        """
+        if cursor is not None and self.cursor is not None and cursor < self.cursor:
+            del self.timestamps[:]
+            for column in self.columns.values():
+                del column[:]
+            return True
+        return False
+
+    def _load(self):
+        """Fill the window from the store."""
+        try:
+            cursor, rows = self.store.load(time.time() - self.hours * 3600)
+        except sqlite3.Error as e:
+            print(f"Could not load cached history: {e}")
+            return
+        for row in rows:
+            self.timestamps.append(row[0])
+            for column, value in zip(self.columns.values(), row[1:]):
+                column.append(math.nan if value is None else value)
+        self.cursor = cursor
+
+    def _save(self, start: int, cursor: Optional[int], reset: bool):
+        """
+        Copy records appended from an index onwards to the store.
+
+        :param start: Index of the first new record
+        :param cursor: Cursor the window is moving to
+        :param reset: Whether the window was emptied first
+        """
+        if self.store is None or (start == len(self.timestamps) and cursor == self.cursor and not reset):
+            return
+        try:
+            self.store.save(self.timestamps[start:], {field: column[start:] for field, column in self.columns.items()},
+                            cursor, reset, time.time() - self.hours * 3600)
+        except sqlite3.Error as e:
+            # The in-memory window stays correct; the cache catches up on the next fetch
+            print(f"Could not save history cache: {e}")
+
+    def evict(self):
+        """Drop records that have fallen out of the window."""
+        expired = bisect_right(self.timestamps, time.time() - self.hours * 3600)
+        if expired:
+            del self.timestamps[:expired]
+            for column in self.columns.values():
+                del column[:expired]
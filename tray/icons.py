@@ -0,0 +1,101 @@
+"""
+Tray icon rendering.
+
+Fonts are loaded once and rendered icons are kept in an LRU cache keyed by
+the displayed text and style, so redrawing the icon for a value it has shown
+before costs a dictionary lookup. The same image object comes back for the
+same key, which lets callers skip reassigning an unchanged icon.
+"""
+import math
+from functools import lru_cache
+from typing import Iterable, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+ICON_SIZE = 64
+FONT_SIZE = 48
+
+# Bold first for better visibility in the system tray, then fallbacks
+FONT_FILES = ("arialbd.ttf", "arial.ttf", "DejaVuSans-Bold.ttf")
+
+# UV index values worth rendering up front: the scale plus the "no data" placeholder
+COMMON_UV_VALUES = tuple(range(0, 13)) + ("--",)
+
+
+def format_value(value) -> str:
+    """
+    Text shown on the icon for a value.
+
+    Numbers are rounded to whole units, since two characters is all the icon fits.
+
+    :param value: Value to display, e.g. a UV index or "--"
+    :return: Display text
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return str(round(number)) if math.isfinite(number) else "--"
+
+
+class IconRenderer:
+    """Renders and caches square tray icons showing a short value."""
+
+    def __init__(self, cache_size: int = 64):
+        """
+        :param cache_size: Number of rendered icons kept
+        """
+        self.font = _load_font()
+        self._render_cached = lru_cache(maxsize=cache_size)(self._render)
+
+    def render(self, value, background: str = 'darkblue', foreground: str = 'white') -> Image.Image:
+        """
+        Get the icon for a value, rendering it only if it isn't cached.
+
+        :param value: Value to display (see format_value())
+        :param background: Background colour
+        :param foreground: Text colour
+        :return: The icon image; the same object for the same text and style while cached
+        """
+        return self._render_cached(format_value(value), background, foreground)
+
+    def preload(self, values: Iterable = COMMON_UV_VALUES, styles: Iterable[Tuple[str, str]] = (('darkblue', 'white'),)):
+        """
+        Render icons ahead of time, e.g. at startup.
+
+        :param values: Values to render
+        :param styles: (background, foreground) pairs to render each value in
+        """
+        for background, foreground in styles:
+            for value in values:
+                self.render(value, background, foreground)
+
+    def _render(self, text: str, background: str, foreground: str) -> Image.Image:
+        """Draw the text centred on a new icon."""
+        image = Image.new('RGB', (ICON_SIZE, ICON_SIZE), color=background)
+        draw = ImageDraw.Draw(image)
+
+        # Centre the text for both single and double digit values
+        bbox = draw.textbbox((0, 0), text, font=self.font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        x = (ICON_SIZE - text_width) // 2
+        # Adjust y to account for font descender space (moves text down slightly)
+        y = (ICON_SIZE - text_height) // 2 - bbox[1]
+
+        draw.text((x, y), text, fill=foreground, font=self.font)
+        return image
+
+
+def _load_font() -> ImageFont.ImageFont:
+    """Load the first available icon font, falling back to Pillow's built-in font."""
+    for font_file in FONT_FILES:
+        try:
+            return ImageFont.truetype(font_file, FONT_SIZE)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=FONT_SIZE)
+    except TypeError:
+        # Pillow before 10.1 only has a fixed-size bitmap default font
+        return ImageFont.load_default()
@@ -1,72 +1,183 @@
 import requests
-from PIL import Image, ImageDraw, ImageFont
 import pystray
 import threading
 import time
 import json
+import os
 import webbrowser
 from window import WeatherWindow, app_state
-from recommendations import get_all_recommendations
+from history import HistoryWindow, HISTORY_FIELDS, open_store
+from paths import cache_dir
+import columnar
+from recommendations import get_all_recommendations, get_cached_recommendations
 from version import __version__
-from update_checker import check_for_updates
+from update_checker import UpdateChecker
+from icons import IconRenderer
+from client import BackendClient, backoff
 
 # Hardcoded for now for testing purposes
 backend_location = "http://192.168.50.115:8000"
 
+# Keep-alive connections to the backend, shared by every request
+client = BackendClient(backend_location)
+
 # Load configuration
 with open('config.json', 'r') as f:
     config = json.load(f)
 
+# Seconds without any data (the backend sends keepalives) before the live stream is treated as dropped
+STREAM_READ_TIMEOUT = 60
+
+# Seconds between polls while the live stream is unavailable
+POLL_INTERVAL = 60
+
+# Seconds before retrying after a failed refresh, doubled for each further failure up to POLL_INTERVAL
+FAILURE_RETRY_DELAY = 5
+
+# Local copy of the history window, reused across restarts
+HISTORY_CACHE_FILE = "history.db"
+
+# Last 24 hours of history, loaded from the local copy and kept up to date by delta fetches
+history = HistoryWindow(hours=24, store=open_store(
+    os.path.join(cache_dir(), HISTORY_CACHE_FILE),
+    source=f"{backend_location}|{config.get('station') or ''}"
+))
+
+# Fonts loaded once; rendered icons cached by value
+icon_renderer = IconRenderer()
+
+# Checks GitHub for new releases in the background; the menu reads its cached result
+updates = UpdateChecker()
+
+# ETag and body of the last /data/latest response, reused when the backend answers 304 Not Modified
+latest_cache = {"etag": None, "data": None}
+
+
+def station_params():
+    """
+    Builds the query parameters that select this tray's station on a shared backend.
+
+    :return: Dictionary with the configured station PASSKEY, or empty if none is configured
+    """
+    station = config.get('station')
+    return {"station": station} if station else {}
+
 
 def fetch_latest_weather():
     """
     Sends a GET request to the backend to retrieve the latest weather station report.
+
+    Conditional on the report already held, so an unchanged report costs an empty 304 response.
     """
     endpoint = "/data/latest"
-    response = requests.get(backend_location + endpoint, timeout=5)
-    return response.json()
+    headers = {"If-None-Match": latest_cache["etag"]} if latest_cache["etag"] else {}
+    response = client.get(endpoint, params=station_params(), headers=headers)
+    if response.status_code == 304:
+        return latest_cache["data"]
+    data = response.json()
+    latest_cache["etag"] = response.headers.get("ETag")
+    latest_cache["data"] = data
+    return data
 
 
-def fetch_history(hours=24):
+def fetch_history(hours=24, since_id=None, etag=None):
     """
     Sends a GET request to the backend to retrieve historical weather data.
 
+    Asks for the columnar encoding, falling back to JSON if the backend doesn't offer it,
+    and only for the metrics the history window keeps.
+
     :param hours: Number of hours to look back (default 24)
-    :return: List of historical weather records
+    :param since_id: Cursor from the previous fetch; only newer records are returned
+    :param etag: ETag from the previous fetch; the backend answers 304 if nothing was stored since
+    :return: Tuple of (decoded columns dictionary or list of records, or None if nothing changed,
+             next cursor, ETag)
+    """
+    endpoint = "/data/history"
+    params = {**station_params(), "hours": hours, "fields": ",".join(HISTORY_FIELDS)}
+    if since_id is not None:
+        params["since_id"] = since_id
+    headers = {"Accept": f"{columnar.MEDIA_TYPE}, application/json"}
+    if etag:
+        headers["If-None-Match"] = etag
+    response = client.get(endpoint, params=params, headers=headers)
+    if response.status_code == 304:
+        return None, since_id, etag
+    etag = response.headers.get("ETag")
+    cursor = response.headers.get("X-Next-Cursor")
+    cursor = int(cursor) if cursor is not None else None
+    if response.headers.get("Content-Type", "").startswith(columnar.MEDIA_TYPE):
+        return columnar.decode(response.content), cursor, etag
+    return response.json(), cursor, etag
+
+
+def sync_history():
     """
-    endpoint = f"/data/history?hours={hours}"
-    response = requests.get(backend_location + endpoint, timeout=5)
+    Brings the in-memory history window up to date, downloading only new records.
+
+    :return: The history window, which recommendations read column-wise
+    """
+    data, cursor, etag = fetch_history(hours=history.hours, since_id=history.cursor, etag=history.etag)
+    if data is None:
+        # Nothing stored since the last fetch
+        history.evict()
+    elif isinstance(data, dict):
+        history.apply_columns(data, cursor)
+    else:
+        history.apply(data, cursor)
+    history.etag = etag
+    return history
+
+def fetch_recommendations(profile):
+    """
+    Sends a GET request to the backend for recommendations computed server-side.
+
+    :param profile: Name of the backend threshold profile to evaluate against
+    :return: Dictionary with recommendations for each activity
+    """
+    endpoint = "/data/recommendations"
+    params = {**station_params(), "profile": profile}
+    response = client.get(endpoint, params=params)
+    response.raise_for_status()
     return response.json()
 
+
+def fetch_weather(current_weather=None):
+    """
+    Fetches the latest report and what recommendations need at the same time: server-side
+    recommendations when a profile is configured, otherwise new history to compute them
+    locally from config.json thresholds.
+
+    :param current_weather: Latest report if already known (e.g. pushed by the stream);
+                            fetched from the backend when omitted.
+    :return: Tuple of (latest report, dictionary with recommendations for each activity)
+    """
+    latest = client.submit(fetch_latest_weather) if current_weather is None else None
+    profile = config.get('recommendation_profile')
+    if profile:
+        pending = client.submit(fetch_recommendations, profile)
+    else:
+        pending = client.submit(sync_history)
+
+    if latest is not None:
+        current_weather = latest.result()
+    if profile:
+        return current_weather, pending.result()
+    return current_weather, get_all_recommendations(current_weather, pending.result(), config)
+
+
 def create_icon(uv_value):
     """
     Creates an icon to be shown in the tray. Currently supports displaying the UV.
 
-    Generates a 64x64 image with the UV written to the centre.
+    Generates a 64x64 image with the UV written to the centre. Icons are cached by
+    icon_renderer, so the same value returns the same image object.
 
     :param uv_value: The reported UV from the latest weather station report.
 
-    :return image: The created image object.
+    :return image: The icon image.
     """
-    image = Image.new('RGB', (64, 64), color='darkblue')
-    draw = ImageDraw.Draw(image)
-    # Use bold font for better visibility in system tray
-    try:
-        font = ImageFont.truetype("arialbd.ttf", 48)  # Arial Bold
-    except:
-        font = ImageFont.truetype("arial.ttf", 48)  # Fallback to regular
-
-    # Centre the text for both single and double digit UV values
-    uv_text = str(uv_value)
-    bbox = draw.textbbox((0, 0), uv_text, font=font)
-    text_width = bbox[2] - bbox[0]
-    text_height = bbox[3] - bbox[1]
-    x = (64 - text_width) // 2
-    # Adjust y to account for font descender space (moves text down slightly)
-    y = (64 - text_height) // 2 - bbox[1]
-
-    draw.text((x, y), uv_text, fill='white', font=font)
-    return image
+    return icon_renderer.render(uv_value)
 
 
 def create_menu(data):
@@ -93,8 +204,8 @@ def create_menu(data):
     items.append(pystray.Menu.SEPARATOR)
     items.append(pystray.MenuItem("Show", on_click, default=True))
 
-    # Check for updates
-    update_available, latest_version, download_url = check_for_updates()
+    # Result of the last background update check
+    update_available, latest_version, download_url = updates.status()
     if update_available:
         items.append(pystray.MenuItem(
             f"⚠ Update available: v{latest_version}",
@@ -117,42 +228,93 @@ def quit_app(icon):
     weather_window.window.quit()
 
 
-def update_loop():
+def refresh(current_weather=None):
     """
-    Checks for latest weather reported from backend every 60 seconds.
-    Fetches current weather and historical data, computes recommendations,
+    Fetches current weather and new history, computes recommendations,
     and updates the icon and menu.
+
+    :param current_weather: Latest report if already known (e.g. pushed by the stream);
+                            fetched from the backend when omitted.
+    :return: True if the refresh succeeded
     """
-    while True:
-        try:
-            # Fetch current weather and history
-            current_weather = fetch_latest_weather()
-            history = fetch_history(hours=24)
-
-            # Compute recommendations
-            recommendations = get_all_recommendations(current_weather, history, config)
-
-            # Update app state
-            app_state["latest_data"] = current_weather
-            app_state["recommendations"] = recommendations
-            app_state["error"] = None
-
-            # Update tray icon and menu
-            uv = current_weather.get('uv', '--')
-            icon.icon = create_icon(uv)
-            icon.menu = create_menu(current_weather)
-
-        except requests.exceptions.ConnectionError:
-            app_state["error"] = "Cannot connect to backend"
-            print("Backend connection failed")
-        except requests.exceptions.Timeout:
-            app_state["error"] = "Backend request timed out"
-            print("Backend timeout")
-        except Exception as e:
-            app_state["error"] = f"Error: {str(e)}"
-            print(f"Error in update loop: {e}")
+    try:
+        # Fetch current weather and recommendations concurrently
+        current_weather, recommendations = fetch_weather(current_weather)
+
+        # Update app state; the window re-renders whatever changed
+        app_state.update(latest_data=current_weather, recommendations=recommendations, error=None)
+
+        # Update tray icon and menu
+        uv = current_weather.get('uv', '--')
+        image = create_icon(uv)
+        # Cached icons are reused, so an unchanged value needs no redraw by the tray
+        if image is not icon.icon:
+            icon.icon = image
+        icon.menu = create_menu(current_weather)
+        return True
+
+    except requests.exceptions.ConnectionError:
+        app_state["error"] = "Cannot connect to backend"
+        print("Backend connection failed")
+    except requests.exceptions.Timeout:
+        app_state["error"] = "Backend request timed out"
+        print("Backend timeout")
+    except Exception as e:
+        app_state["error"] = f"Error: {str(e)}"
+        print(f"Error in update loop: {e}")
+    return False
+
+
+def read_stream_events(response):
+    """
+    Parses a Server-Sent Events response into event payloads.
+
+    :param response: Streaming response from /data/stream
+    :return: Generator of decoded JSON payloads, one per event
+    """
+    data_lines = []
+    for line in response.iter_lines(decode_unicode=True):
+        if line.startswith("data:"):
+            data_lines.append(line[5:].strip())
+        elif not line and data_lines:
+            yield json.loads("\n".join(data_lines))
+            data_lines = []
+
 
-        time.sleep(60)
+def listen_for_reports():
+    """
+    Subscribes to the backend's live report stream and refreshes as soon as
+    each report arrives. Returns when the stream drops.
+    """
+    try:
+        with client.stream("/data/stream", params=station_params(), read_timeout=STREAM_READ_TIMEOUT) as response:
+            response.raise_for_status()
+            print("Subscribed to live weather reports")
+            for report in read_stream_events(response):
+                refresh(current_weather=report)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"Live report stream unavailable: {e}")
+
+
+def update_loop():
+    """
+    Keeps the tray up to date with the backend.
+
+    Follows the live report stream while it is available. When the stream drops
+    (or is disabled in config.json) it polls every 60 seconds instead and tries
+    to resubscribe before each poll. After a failed refresh it retries sooner,
+    backing off from 5 seconds up to the poll interval.
+    """
+    failures = 0
+    while True:
+        if config.get('live_updates', True):
+            listen_for_reports()
+        if refresh():
+            failures = 0
+            time.sleep(POLL_INTERVAL)
+        else:
+            time.sleep(backoff(failures, FAILURE_RETRY_DELAY, POLL_INTERVAL))
+            failures += 1
 
 
 def on_click(icon, item):
@@ -194,7 +356,7 @@ def check_backend_available():
     :return: True if backend is reachable, False otherwise
     """
     try:
-        response = requests.get(backend_location + "/health", timeout=5)
+        response = client.get("/health")
         if response.status_code == 200:
             print(f"Backend connected: {backend_location}")
             return True
@@ -216,25 +378,32 @@ def check_backend_available():
 if __name__ == "__main__":
     # Check backend is available
     if not check_backend_available():
-        print("\nCannot start tray application without backend connection.")
-        print("Exiting...")
-        exit(1)
+        if not len(history):
+            print("\nCannot start tray application without backend connection.")
+            print("Exiting...")
+            exit(1)
+        # Predictions from the cached history until the update loop reaches the backend
+        print(f"\nStarting with {len(history)} cached history records; will keep trying the backend.")
+        app_state.update(recommendations=get_cached_recommendations(history, config),
+                         error="Cannot connect to backend")
+    else:
+        # Fetch initial data before starting UI; only history newer than the local copy is downloaded
+        print("Fetching initial weather data...")
+        try:
+            current_weather, recommendations = fetch_weather()
 
-    # Fetch initial data before starting UI
-    print("Fetching initial weather data...")
-    try:
-        current_weather = fetch_latest_weather()
-        history = fetch_history(hours=24)
-        recommendations = get_all_recommendations(current_weather, history, config)
-
-        # Populate app_state with initial data
-        app_state["latest_data"] = current_weather
-        app_state["recommendations"] = recommendations
-        app_state["error"] = None
-        print("Initial data loaded successfully")
-    except Exception as e:
-        print(f"Warning: Could not fetch initial data: {e}")
-        # Continue anyway - update loop will retry
+            # Populate app_state with initial data
+            app_state.update(latest_data=current_weather, recommendations=recommendations, error=None)
+            print("Initial data loaded successfully")
+        except Exception as e:
+            print(f"Warning: Could not fetch initial data: {e}")
+            # Continue anyway - update loop will retry
+
+    # Check for new releases off the update loop
+    updates.start()
+
+    # Render the usual UV values before the first refresh needs them
+    icon_renderer.preload()
 
     # Create tray icon
     icon = pystray.Icon("weather", create_icon("--"), "Weather",
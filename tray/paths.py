@@ -0,0 +1,30 @@
+"""
+Locations of the tray's on-disk state.
+
+Cached data lives in the per-user cache directory rather than next to the
+executable, which is unpacked to a temporary folder by the PyInstaller build.
+"""
+import os
+import sys
+
+APP_NAME = "WeatherTray"
+
+
+def cache_dir() -> str:
+    """
+    Per-user cache directory for the tray, created if it doesn't exist.
+
+    %LOCALAPPDATA%\\WeatherTray on Windows, ~/Library/Caches/WeatherTray on macOS
+    and $XDG_CACHE_HOME/WeatherTray (default ~/.cache) elsewhere.
+
+    :return: Absolute path of the directory
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    elif sys.platform == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    path = os.path.join(base, APP_NAME)
+    os.makedirs(path, exist_ok=True)
+    return path
@@ -2,10 +2,20 @@
 Activity recommendation logic for weather-based outdoor activities.
 
 Simple if/else logic to determine if conditions are suitable for running, cycling, or swimming.
+
+Predictions over history use a batch path: the history is held as column
+arrays, each threshold test is run once over its column to build a mask, and
+masks are combined per activity. A mask is a Python int with one byte per
+record (0 or 1), so combining masks with & runs at C speed, and activities
+with the same thresholds share the same masks.
 """
-from typing import Dict, List, Optional
+import math
+from array import array
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 from datetime import datetime
 
+ACTIVITIES = ('run', 'cycle', 'swim')
+
 
 def evaluate_activity(activity: str, weather: Dict, config: Dict) -> Dict:
     """
@@ -92,51 +102,144 @@ def evaluate_activity(activity: str, weather: Dict, config: Dict) -> Dict:
     }
 
 
-def predict_good_time(activity: str, history: List[Dict], config: Dict) -> Optional[str]:
+def history_to_columns(history: List[Dict]) -> Tuple[array, Dict[str, array]]:
     """
-    Find when conditions were good yesterday for prediction.
+    Convert a list of history records into column arrays, parsing each record once.
 
-    Looks through historical data to find the first time yesterday when
-    conditions were suitable for the activity.
+    Missing or malformed values (and timestamps) become NaN.
 
-    :param activity: Activity name ("run", "cycle", or "swim")
-    :param history: List of historical weather records
-    :param config: Configuration dictionary with thresholds
-    :return: Prediction message or None if no good times found
+    :param history: List of historical weather records, oldest first
+    :return: Tuple of (epoch-second timestamps, dictionary of metric columns)
     """
-    # Validate history is a list
-    if not isinstance(history, list):
-        return None
-
-    good_times = []
-
+    timestamps = array('d')
+    columns = {metric: array('d') for metric in ('temp_c', 'uv', 'rain_rate_mm', 'wind_speed_kmh')}
     for record in history:
-        # Skip if record is not a dictionary
         if not isinstance(record, dict):
             continue
-
-        evaluation = evaluate_activity(activity, record, config)
-        if evaluation['status'] == 'green':
+        try:
+            timestamp = record['timestamp']
+            if not isinstance(timestamp, (int, float)):
+                timestamp = datetime.fromisoformat(timestamp).timestamp()
+            timestamps.append(timestamp)
+        except (KeyError, ValueError, TypeError):
+            timestamps.append(math.nan)
+        for metric, column in columns.items():
             try:
-                timestamp = datetime.fromisoformat(record['timestamp'])
-                good_times.append(timestamp)
+                column.append(float(record[metric]))
             except (KeyError, ValueError, TypeError):
-                continue
+                column.append(math.nan)
+    return timestamps, columns
+
+
+def _as_columns(history) -> Optional[Tuple[Sequence[float], Dict[str, Sequence[float]]]]:
+    """
+    Accept history as a list of records or as an object holding columns
+    (a `timestamps` sequence and a `columns` dictionary, e.g. a HistoryWindow).
+
+    :return: Tuple of (timestamps, columns), or None if the history is unusable
+    """
+    if isinstance(history, list):
+        return history_to_columns(history)
+    if hasattr(history, 'timestamps') and hasattr(history, 'columns'):
+        return history.timestamps, history.columns
+    return None
+
+
+def _mask(values: Sequence[float], test) -> int:
+    """
+    Run a test over a column and pack the results into a mask.
+
+    :param values: Column values
+    :param test: Function returning True for values that pass
+    :return: Mask with byte i set to 1 where values[i] passes
+    """
+    return int.from_bytes(bytes(map(test, values)), 'little')
+
+
+def predict_good_times(history, config: Dict,
+                       activities: Sequence[str] = ACTIVITIES) -> Dict[str, Optional[str]]:
+    """
+    Find when conditions were first good in the history, for several activities at once.
+
+    Uses the same thresholds as evaluate_activity(): a record is good when the
+    activity would be green. Missing temperature or UV counts as not good;
+    missing rain or wind counts as none.
+
+    :param history: List of records or columns (see _as_columns), oldest first
+    :param config: Configuration dictionary with thresholds
+    :param activities: Activities to predict for
+    :return: Dictionary of activity to prediction message, or None if no good time was found
+    """
+    predictions = {activity: None for activity in activities}
+    columns_data = _as_columns(history)
+    if columns_data is None:
+        return predictions
+    timestamps, columns = columns_data
+    count = len(timestamps)
+    if not count:
+        return predictions
+
+    missing = array('d', [math.nan]) * count
+    masks = {}
+
+    def mask(metric: str, kind: str, limit: float) -> int:
+        key = (metric, kind, limit)
+        if key not in masks:
+            values = columns.get(metric, missing)
+            if kind == 'min':
+                masks[key] = _mask(values, lambda v: v >= limit)
+            elif kind == 'max':
+                masks[key] = _mask(values, lambda v: v <= limit)
+            else:
+                # NaN fails every comparison, so a missing value is never "over"
+                masks[key] = _mask(values, lambda v: not v > limit)
+        return masks[key]
+
+    has_timestamp = _mask(timestamps, lambda t: t == t)
+
+    for activity in activities:
+        thresholds = config['activity_thresholds'].get(activity)
+        if thresholds is None:
+            continue
+
+        good = (has_timestamp
+                & mask('temp_c', 'min', thresholds['temp_min_c'])
+                & mask('temp_c', 'max', thresholds['temp_max_c'])
+                & mask('rain_rate_mm', 'not_over', thresholds['rain_rate_max_mm'])
+                & mask('uv', 'max', thresholds['uv_max']))
+        if 'wind_max_kmh' in thresholds:
+            good &= mask('wind_speed_kmh', 'not_over', thresholds['wind_max_kmh'])
+
+        if good:
+            # Lowest set byte is the first good record
+            first = ((good & -good).bit_length() - 1) // 8
+            first_good = datetime.fromtimestamp(timestamps[first])
+            predictions[activity] = f"Yesterday at {first_good.strftime('%I:%M %p')} was good"
+
+    return predictions
+
+
+def predict_good_time(activity: str, history: Union[List[Dict], object], config: Dict) -> Optional[str]:
+    """
+    Find when conditions were good yesterday for prediction.
 
-    if not good_times:
-        return None
+    Looks through historical data to find the first time yesterday when
+    conditions were suitable for the activity.
 
-    # Return first good time yesterday
-    first_good = min(good_times)
-    return f"Yesterday at {first_good.strftime('%I:%M %p')} was good"
+    :param activity: Activity name ("run", "cycle", or "swim")
+    :param history: List of historical weather records (or history columns), oldest first
+    :param config: Configuration dictionary with thresholds
+    :return: Prediction message or None if no good times found
+    """
+    return predict_good_times(history, config, [activity])[activity]
 
 
-def get_all_recommendations(current_weather: Dict, history: List[Dict], config: Dict) -> Dict:
+def get_all_recommendations(current_weather: Dict, history, config: Dict) -> Dict:
     """
     Get recommendations for all activities.
 
     :param current_weather: Current weather data
-    :param history: Historical weather data (last 24 hours)
+    :param history: Historical weather data (last 24 hours), as a list of records or history columns
     :param config: Configuration dictionary
     :return: Dictionary with recommendations for each activity
     """
@@ -150,22 +253,46 @@ def get_all_recommendations(current_weather: Dict, history: List[Dict], config:
                 "score": 0,
                 "prediction": None
             }
-            for activity in ['run', 'cycle', 'swim']
+            for activity in ACTIVITIES
         }
 
-    recommendations = {}
-
-    for activity in ['run', 'cycle', 'swim']:
-        evaluation = evaluate_activity(activity, current_weather, config)
-        prediction = None
+    evaluations = {
+        activity: evaluate_activity(activity, current_weather, config)
+        for activity in ACTIVITIES
+    }
 
-        # Only show prediction if conditions aren't currently good
-        if evaluation['status'] != 'green' and isinstance(history, list):
-            prediction = predict_good_time(activity, history, config)
+    # Only show prediction if conditions aren't currently good
+    needs_prediction = [activity for activity, evaluation in evaluations.items()
+                        if evaluation['status'] != 'green']
+    predictions = predict_good_times(history, config, needs_prediction) if needs_prediction else {}
 
-        recommendations[activity] = {
+    return {
+        activity: {
             **evaluation,
-            "prediction": prediction
+            "prediction": predictions.get(activity)
         }
+        for activity, evaluation in evaluations.items()
+    }
+
+
+def get_cached_recommendations(history, config: Dict) -> Dict:
+    """
+    Get recommendations when there is no current report, e.g. while the backend is unreachable.
 
-    return recommendations
+    Conditions can't be judged without a current report, so every activity is
+    "unknown", but predictions from the cached history are still shown.
+
+    :param history: Historical weather data (last 24 hours), as a list of records or history columns
+    :param config: Configuration dictionary
+    :return: Dictionary with recommendations for each activity
+    """
+    predictions = predict_good_times(history, config)
+    return {
+        activity: {
+            "status": "unknown",
+            "reasons": ["No current data"],
+            "score": 0,
+            "prediction": predictions.get(activity)
+        }
+        for activity in ACTIVITIES
+    }
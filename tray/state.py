@@ -0,0 +1,80 @@
+"""
+Shared tray state with change notification.
+
+The update thread writes the latest report, recommendations and errors; the
+Tk thread renders them. Every key carries a version that is bumped only when
+its value actually changes, and listeners are told which keys changed, so the
+window can schedule a render when there is something new and then redraw
+just the affected widgets.
+"""
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Set
+
+
+class AppState:
+    """Versioned key/value state, readable and writable like a dictionary."""
+
+    def __init__(self, **values):
+        """
+        :param values: Initial values
+        """
+        self._values: Dict[str, Any] = dict(values)
+        self._versions: Dict[str, int] = {key: 1 for key in values}
+        self._listeners: List[Callable[[Set[str]], None]] = []
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: str):
+        with self._lock:
+            return self._values[key]
+
+    def __setitem__(self, key: str, value):
+        self.update(**{key: value})
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def update(self, **values):
+        """
+        Set several values at once, notifying listeners once if any of them changed.
+
+        :param values: New values by key
+        """
+        changed = set()
+        with self._lock:
+            for key, value in values.items():
+                if key in self._values and self._values[key] == value:
+                    continue
+                self._values[key] = value
+                self._versions[key] = self._versions.get(key, 0) + 1
+                changed.add(key)
+            listeners = list(self._listeners) if changed else []
+        for listener in listeners:
+            listener(changed)
+
+    def subscribe(self, listener: Callable[[Set[str]], None]):
+        """
+        Call a function whenever values change. It runs on the thread that made the
+        change, so UI code should only schedule work from it.
+
+        :param listener: Called with the set of changed keys
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def changes(self, seen: Dict[str, int], keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        Values that changed since a reader last saw them.
+
+        :param seen: Versions the reader has seen, by key; updated in place
+        :param keys: Keys the reader is interested in
+        :return: Changed values by key
+        """
+        changed = {}
+        with self._lock:
+            for key in keys:
+                version = self._versions.get(key, 0)
+                if seen.get(key) != version:
+                    seen[key] = version
+                    changed[key] = self._values.get(key)
+        return changed
@@ -25,6 +25,8 @@ class ActivityCard(tk.Frame):
     def __init__(self, parent, activity_name: str, **kwargs):
         super().__init__(parent, bg=COLORS['bg_card'], **kwargs)
         self.activity_name = activity_name
+        # Last recommendation shown, so an unchanged one isn't re-applied
+        self.recommendation = None
 
         # Activity name label
         self.name_label = tk.Label(
@@ -76,12 +78,15 @@ class ActivityCard(tk.Frame):
 
         :param recommendation: Dictionary with status, reasons, and prediction
         """
+        if recommendation == self.recommendation:
+            return
+        self.recommendation = recommendation
         status = recommendation.get('status', 'red')
         reasons = recommendation.get('reasons', [])
         prediction = recommendation.get('prediction')
 
-        # Update circle color
-        color = COLORS[status]
+        # Update circle color; grey when there is no current data to judge by
+        color = COLORS.get(status, COLORS['text_secondary'])
         self.status_canvas.itemconfig(self.circle, fill=color)
 
         # Update status text
@@ -89,6 +94,9 @@ class ActivityCard(tk.Frame):
             self.status_text.config(text="Good to go!", fg=COLORS['green'])
         elif status == 'yellow':
             self.status_text.config(text="Moderate UV", fg=COLORS['yellow'])
+        elif status == 'unknown':
+            reason_text = reasons[0] if reasons else "No current data"
+            self.status_text.config(text=reason_text, fg=COLORS['text_secondary'])
         else:
             reason_text = reasons[0] if reasons else "Not recommended"
             self.status_text.config(text=reason_text, fg=COLORS['red'])
@@ -106,6 +114,7 @@ class WeatherMetricRow(tk.Frame):
 
     def __init__(self, parent, label: str, value: str = "--", **kwargs):
         super().__init__(parent, bg=COLORS['bg_dark'], **kwargs)
+        self.value = value
 
         self.label = tk.Label(
             self,
@@ -134,4 +143,6 @@ class WeatherMetricRow(tk.Frame):
 
         :param value: New value to display
         """
-        self.value_label.config(text=value)
+        if value != self.value:
+            self.value = value
+            self.value_label.config(text=value)
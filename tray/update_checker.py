@@ -2,38 +2,152 @@
 Update checker for Weather Tray application.
 
 Checks GitHub releases for newer versions and notifies the user.
+
+Checks run on their own background thread, a few times a day, and the result
+is cached on disk so restarts don't repeat them. Requests are conditional on
+the last release's ETag, and failures back off exponentially. The menu only
+ever reads the cached result.
 """
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional, Tuple
+
 import requests
+from paths import cache_dir
 from version import __version__
 
 
-GITHUB_REPO = "ShayneJG/weather-api"  
+GITHUB_REPO = "ShayneJG/weather-api"
 RELEASE_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}/releases/latest"
 
+# Seconds between checks; unauthenticated GitHub API calls are limited per IP address
+CHECK_INTERVAL = 12 * 3600
 
-def check_for_updates():
-    """
-    Check if a newer version is available on GitHub releases.
+# Seconds before retrying a failed check, doubled for each further failure up to CHECK_INTERVAL
+RETRY_DELAY = 60
 
-    :return: Tuple of (update_available: bool, latest_version: str, download_url: str)
-    """
-    try:
-        response = requests.get(RELEASE_API_URL, timeout=5)
-        response.raise_for_status()
+CACHE_FILE = "update_check.json"
 
-        release_data = response.json()
-        latest_version = release_data.get("tag_name", "").lstrip("v")
-        download_url = release_data.get("html_url", "")
 
-        # Compare versions
+class UpdateChecker:
+    """Checks for new releases in the background and keeps the latest result."""
+
+    def __init__(self, cache_path: Optional[str] = None, interval: float = CHECK_INTERVAL):
+        """
+        :param cache_path: JSON file the result is kept in (default: in the tray's cache directory)
+        :param interval: Seconds between successful checks
+        """
+        self.cache_path = cache_path or os.path.join(cache_dir(), CACHE_FILE)
+        self.interval = interval
+        self.etag: Optional[str] = None
+        self.latest_version: Optional[str] = None
+        self.download_url = ""
+        # Epoch seconds of the last successful check
+        self.checked_at = 0.0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load()
+
+    def status(self) -> Tuple[bool, str, str]:
+        """
+        The cached result of the last check. Never touches the network.
+
+        :return: Tuple of (update_available: bool, latest_version: str, download_url: str)
+        """
+        with self._lock:
+            latest_version, download_url = self.latest_version, self.download_url
         if latest_version and _is_newer_version(latest_version, __version__):
             return True, latest_version, download_url
-
         return False, __version__, ""
 
-    except (requests.exceptions.RequestException, ValueError, KeyError):
-        # Silently fail if update check fails
-        return False, __version__, ""
+    def check(self) -> bool:
+        """
+        Ask GitHub for the latest release, conditional on the one already known.
+
+        :return: True if the check succeeded (including "not modified")
+        """
+        headers = {"Accept": "application/vnd.github+json"}
+        if self.etag and self.latest_version is not None:
+            headers["If-None-Match"] = self.etag
+        try:
+            response = requests.get(RELEASE_API_URL, headers=headers, timeout=5)
+            if response.status_code != 304:
+                response.raise_for_status()
+                release_data = response.json()
+                latest_version = release_data.get("tag_name", "").lstrip("v")
+                download_url = release_data.get("html_url", "")
+        except (requests.exceptions.RequestException, ValueError, AttributeError):
+            with self._lock:
+                self.failures += 1
+            return False
+
+        with self._lock:
+            if response.status_code != 304:
+                self.etag = response.headers.get("ETag")
+                self.latest_version = latest_version
+                self.download_url = download_url
+            self.checked_at = time.time()
+            self.failures = 0
+        self._save()
+        return True
+
+    def start(self):
+        """Start checking on a background thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background thread."""
+        self._stop.set()
+
+    def _run(self):
+        """Check whenever the next check is due until stopped."""
+        while not self._stop.wait(self._next_delay()):
+            self.check()
+
+    def _next_delay(self) -> float:
+        """Seconds until the next check: backing off after failures, otherwise interval after the last success."""
+        with self._lock:
+            failures, checked_at = self.failures, self.checked_at
+        if failures:
+            # Jittered, so trays that failed together don't retry together
+            return min(self.interval, RETRY_DELAY * 2 ** (failures - 1)) * random.uniform(0.5, 1.0)
+        return max(0.0, checked_at + self.interval - time.time())
+
+    def _load(self):
+        """Restore the last result from disk, if there is a readable one."""
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f)
+            self.etag = cached.get("etag")
+            self.latest_version = cached.get("latest_version")
+            self.download_url = cached.get("download_url", "")
+            self.checked_at = float(cached.get("checked_at", 0))
+        except (OSError, ValueError, TypeError, AttributeError):
+            pass
+
+    def _save(self):
+        """Write the result to disk, replacing the old file in one step."""
+        with self._lock:
+            cached = {
+                "etag": self.etag,
+                "latest_version": self.latest_version,
+                "download_url": self.download_url,
+                "checked_at": self.checked_at,
+            }
+        temp_path = self.cache_path + ".tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(cached, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not save update check result: {e}")
 
 
 def _is_newer_version(latest: str, current: str) -> bool:
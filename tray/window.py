@@ -2,11 +2,20 @@
 Dark mode weather window with activity recommendations.
 
 Displays color-coded activity cards for run/cycle/swim and current weather metrics.
+
+The window renders only when app_state changes: the update thread's change
+notification schedules a render on the Tk thread with after_idle, and the
+render touches just the widgets whose values changed.
 """
 import tkinter as tk
 from ui_components import ActivityCard, WeatherMetricRow, COLORS
+from state import AppState
+
+app_state = AppState(show_window=False, latest_data={}, recommendations={}, error=None)
 
-app_state = {"show_window": False, "latest_data": {}, "recommendations": {}}
+# State keys the window renders
+RENDERED_KEYS = ("error", "latest_data", "recommendations", "show_window")
+RENDERED_KEYS_SET = frozenset(RENDERED_KEYS)
 
 
 class WeatherWindow:
@@ -82,7 +91,12 @@ class WeatherWindow:
 
         # Close on focus loss
         self.window.bind('<FocusOut>', lambda e: self.hide())
-        self.poll_for_updates()
+
+        # State versions already rendered, and whether a render is scheduled
+        self._seen = {}
+        self._render_pending = False
+        app_state.subscribe(self._state_changed)
+        self._schedule_render()
 
     def show(self):
         """Show window near bottom-right of screen, above taskbar."""
@@ -115,12 +129,25 @@ class WeatherWindow:
         :param data: Current weather data dictionary
         :param recommendations: Activity recommendations dictionary
         """
-        # Update activity cards
+        self.update_recommendations(recommendations)
+        self.update_metrics(data)
+
+    def update_recommendations(self, recommendations: dict):
+        """
+        Update the activity cards. Cards whose recommendation is unchanged are left alone.
+
+        :param recommendations: Activity recommendations dictionary
+        """
         for activity, rec in recommendations.items():
             if activity in self.activity_cards:
                 self.activity_cards[activity].update_status(rec)
 
-        # Update metrics
+    def update_metrics(self, data: dict):
+        """
+        Update the weather metric rows. Rows whose text is unchanged are left alone.
+
+        :param data: Current weather data dictionary
+        """
         self.metrics['uv'].update_value(f"{data.get('uv', '--')}")
         self.metrics['temp_c'].update_value(f"{data.get('temp_c', '--')}°C")
         self.metrics['wind_speed_kmh'].update_value(f"{data.get('wind_speed_kmh', '--')} km/h")
@@ -128,22 +155,43 @@ class WeatherWindow:
         self.metrics['solarradiation'].update_value(f"{data.get('solarradiation', '--')} W/m²")
         self.metrics['humidity'].update_value(f"{data.get('humidity', '--')}%")
 
-    def poll_for_updates(self):
-        """Poll for state changes every second."""
-        # Check for errors
-        if app_state.get("error"):
-            self.error_label.config(text=app_state["error"])
-            self.error_label.pack(pady=10)
-        else:
-            self.error_label.pack_forget()
+    def _state_changed(self, keys):
+        """
+        Called by app_state on whichever thread changed it; schedules one render on the Tk thread.
 
-        # Update data if available
-        if app_state["latest_data"] and app_state["recommendations"]:
-            self.update(app_state["latest_data"], app_state["recommendations"])
+        :param keys: Keys that changed
+        """
+        if not self._render_pending and not RENDERED_KEYS_SET.isdisjoint(keys):
+            self._schedule_render()
+
+    def _schedule_render(self):
+        """Render once Tk is idle, coalescing changes made before then."""
+        self._render_pending = True
+        try:
+            self.window.after_idle(self._render)
+        except (RuntimeError, tk.TclError):
+            # The window has been destroyed, e.g. during shutdown; let a later change try again
+            self._render_pending = False
+
+    def _render(self):
+        """Apply state changes since the last render."""
+        self._render_pending = False
+        changes = app_state.changes(self._seen, RENDERED_KEYS)
+
+        if "error" in changes:
+            error = changes["error"]
+            if error:
+                self.error_label.config(text=error)
+                self.error_label.pack(pady=10)
+            else:
+                self.error_label.pack_forget()
+
+        if changes.get("recommendations"):
+            self.update_recommendations(changes["recommendations"])
+        if changes.get("latest_data"):
+            self.update_metrics(changes["latest_data"])
 
         # Show window if requested
-        if app_state["show_window"]:
+        if changes.get("show_window"):
             app_state["show_window"] = False
             self.show()
-
-        self.window.after(1000, self.poll_for_updates)